@@ -0,0 +1,180 @@
+"""
+Solves a stream of shuffled waffles: words of the solution and shortest swap sequence.
+
+Records are read from JSON lines or CSV, holding the shuffled grid string and its diff
+string, plus any other field (an id for instance) copied to the result:
+
+    {"id": "daily-1", "shuffled": "ROAALAAOELTBVNUITIEIN", "diff": "021002221201222102220"}
+
+Results are written as JSON lines, in completion order, as soon as they are ready:
+
+    {"id": "daily-1", "words": [...], "ambiguous": false, "swaps": [[1, 7], ...], "timings": {...}}
+
+A record failing to be solved gives a result with an "error" field, and the run goes on.
+"ambiguous" is null when a deadline (see solve_record) cut the search for a second solution.
+
+    python batch.py puzzles.jsonl --output solved.jsonl --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Generator, Iterable, List, Optional, TextIO
+from cache import SolutionCache, solve_words, solve_swaps
+from lexicon import Lexicon, get_lexicon
+from parallel import bounded_submit
+from utils import LEXICON_PATH
+
+# Records solved by a worker per task
+CHUNK_SIZE = 16
+# Tasks submitted per worker before waiting for results
+IN_FLIGHT_PER_WORKER = 4
+
+Record = Dict[str, Any]
+
+
+# Lexicon and cache of the current process, opened by warm_worker
+_lexicon: Optional[Lexicon] = None
+_cache: Optional[SolutionCache] = None
+
+
+def warm_worker(cache_path: Optional[str] = None, lexicon_path: str = LEXICON_PATH) -> None:
+    """
+    Loads the lexicon and its indexes once per worker process, and opens the solution cache.
+    :param cache_path: sqlite file of the solution cache, no cache if None
+    :param lexicon_path: Words file or binary lexicon the words are looked up in
+    """
+    global _lexicon, _cache
+    _lexicon = get_lexicon(lexicon_path)
+    if cache_path is not None and _cache is None:
+        _cache = SolutionCache(cache_path, lexicon=_lexicon)
+
+
+def solve_record(record: Record, deadline: Optional[float] = None) -> Record:
+    """
+    Solves one record, never raising: errors are reported in the result.
+    :param deadline: Time by which the word search gives up, as given by time.time, unbounded if None
+    (see solve_words). The swaps are always the shortest ones, found in well under a millisecond.
+    """
+    if "error" in record:
+        return record
+
+    result = {k: v for k, v in record.items() if k not in ("shuffled", "diff")}
+    try:
+        start = time.perf_counter()
+        shuffled = record["shuffled"].upper()
+        diff = record["diff"]
+        if len(shuffled) != 21 or len(diff) != 21:
+            raise ValueError("Grid and diff strings must be 21 characters long")
+
+        words, ambiguous = solve_words(shuffled, diff, _cache, deadline, _lexicon)
+        solved = time.perf_counter()
+
+        swaps = solve_swaps(shuffled, diff, words, _cache)
+        done = time.perf_counter()
+
+        result.update({"words": words, "ambiguous": ambiguous, "swaps": [list(s) for s in swaps],
+                       "timings": {"solve": solved - start, "path": done - solved}})
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    return result
+
+
+def solve_records(records: List[Record]) -> List[Record]:
+    return [solve_record(record) for record in records]
+
+
+def read_records(f: TextIO, fmt: str = "jsonl") -> Generator[Record, None, None]:
+    """
+    Reads records lazily, from JSON lines or from CSV with a header row.
+    Lines that cannot be parsed, or are not JSON objects, give records with an "error" field.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"line": line_number, "error": "{}: {}".format(type(e).__name__, e)}
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            yield {"line": line_number, "error": "Expected a JSON object, got {}".format(type(record).__name__)}
+
+
+def chunked(records: Iterable[Record], size: int) -> Generator[List[Record], None, None]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_stream(records: Iterable[Record], workers: Optional[int] = None, cache_path: Optional[str] = None,
+                 lexicon_path: str = LEXICON_PATH) -> Generator[Record, None, None]:
+    """
+    Solves records across a pool of processes, with a bounded number of records in flight.
+    :param records: Records holding "shuffled" and "diff" grid strings
+    :param workers: Number of processes, all cores by default. With 1, records are solved in this process.
+    :param cache_path: sqlite file of the solution cache, no cache if None
+    :param lexicon_path: Words file or binary lexicon the words are looked up in
+    :return: Results, in completion order
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        warm_worker(cache_path, lexicon_path)
+        for record in records:
+            yield solve_record(record)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker,
+                             initargs=(cache_path, lexicon_path)) as executor:
+        tasks = ((chunk,) for chunk in chunked(records, CHUNK_SIZE))
+        for future in bounded_submit(executor, solve_records, tasks, workers * IN_FLIGHT_PER_WORKER):
+            yield from future.result()
+
+
+def write_results(results: Iterable[Record], output: TextIO) -> Dict[str, int]:
+    """
+    Writes results as JSON lines, flushing after each one.
+    :return: Number of solved and failed records
+    """
+    counts = {"solved": 0, "failed": 0}
+    for result in results:
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+        counts["failed" if "error" in result else "solved"] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves shuffled waffles read from JSON lines or CSV.")
+    parser.add_argument("input", help="input file, standard input if -")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="input format, guessed from the file extension by default")
+    parser.add_argument("--output", default="-", help="output file, standard output by default")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, all cores by default")
+    parser.add_argument("--cache", default=None, help="sqlite file caching solutions across runs")
+    parser.add_argument("--lexicon", default=LEXICON_PATH, help="words file or binary lexicon, words.txt by default")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    with source, destination:
+        counts = write_results(solve_stream(read_records(source, fmt), args.workers, args.cache, args.lexicon), destination)
+
+    print("{solved} solved, {failed} failed".format(**counts), file=sys.stderr)
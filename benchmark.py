@@ -0,0 +1,170 @@
+"""
+Benchmark of the solving pipeline on a seeded corpus of shuffled puzzles.
+
+Each stage (load_data, words_constraints, WaffleSolver.solve, get_diff, a_star) is timed
+separately on every puzzle, for several numbers of shuffling swaps. Peak memory is measured
+in a second pass with tracemalloc, which slows the code it traces. The report is JSON, so runs
+before and after a change can be compared.
+
+    python benchmark.py 200 --swaps 5 10 15 --output before.json
+    python benchmark.py 200 --searches
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from generate import puzzle_rng
+from stats import SolveStats
+from utils import get_diff, grid_to_grid_string, load_data, percentile
+from waffle import Waffle
+from waffle_path import SimplifiedWaffle, a_star, bidirectional_search, heuristic
+from waffle_solver import WaffleSolver, words_constraints
+
+# A stage runs on a puzzle, and returns the number of nodes it expanded (candidate words for the
+# solver, states for a search) if it counts them
+Stage = Callable[[Waffle], Optional[int]]
+
+
+def stage_load_data(waffle: Waffle) -> None:
+    load_data()
+
+
+def stage_words_constraints(waffle: Waffle) -> None:
+    words_constraints(waffle.shuffled_grid, waffle.diff)
+
+
+def stage_solve(waffle: Waffle) -> int:
+    stats = SolveStats()
+    WaffleSolver(waffle.shuffled_grid, waffle.diff, stats=stats).solve()
+    return stats.candidates
+
+
+def stage_get_diff(waffle: Waffle) -> None:
+    get_diff(waffle.true_grid, waffle.shuffled_grid)
+
+
+def stage_a_star(waffle: Waffle) -> int:
+    goal = grid_to_grid_string(waffle.true_grid)
+    stats = SolveStats()
+    a_star(SimplifiedWaffle(grid_to_grid_string(waffle.shuffled_grid), goal=goal),
+           SimplifiedWaffle(goal, goal=goal), stats=stats)
+    return stats.expanded
+
+
+STAGES: Dict[str, Stage] = {
+    "load_data": stage_load_data,
+    "words_constraints": stage_words_constraints,
+    "solve": stage_solve,
+    "get_diff": stage_get_diff,
+    "a_star": stage_a_star,
+}
+
+SEARCHES: Dict[str, Callable[..., List[SimplifiedWaffle]]] = {
+    "a_star": a_star,
+    "a_star_half_misplaced": lambda start, goal, stats: a_star(start, goal, estimate=heuristic, stats=stats),
+    "bidirectional": bidirectional_search,
+}
+
+
+def build_corpus(n: int, seed: int = 0, swaps: int = 10) -> List[Waffle]:
+    """
+    Builds n puzzles shuffled with swaps random swaps. Puzzle i only depends on (seed, i):
+    corpora with the same seed share their grids whatever the number of swaps.
+    """
+    corpus = []
+    for index in range(n):
+        waffle = Waffle(rng=puzzle_rng(seed, index))
+        waffle.shuffle_grid(swaps)
+        corpus.append(waffle)
+    return corpus
+
+
+def summary(values: List[float]) -> Dict[str, float]:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95), "max": max(values, default=0)}
+
+
+def run_stage(stage: Stage, corpus: List[Waffle]) -> Dict[str, Any]:
+    """
+    Runs a stage on every puzzle of the corpus.
+    :return: Latency (seconds) and expanded nodes summaries, and peak memory (bytes) over the corpus
+    """
+    times, nodes = [], []
+    for waffle in corpus:
+        start = time.perf_counter()
+        expanded = stage(waffle)
+        times.append(time.perf_counter() - start)
+        if expanded is not None:
+            nodes.append(expanded)
+
+    tracemalloc.start()
+    peak = 0
+    for waffle in corpus:
+        tracemalloc.reset_peak()
+        stage(waffle)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    report: Dict[str, Any] = {"seconds": summary(times), "peak_memory": peak}
+    if nodes:
+        report["nodes"] = summary(nodes)
+    return report
+
+
+def benchmark(n: int, seed: int = 0, swap_counts: List[int] = (5, 10, 15)) -> Dict[str, Any]:
+    """
+    Runs every stage on corpora of n puzzles, for each number of shuffling swaps.
+    """
+    report: Dict[str, Any] = {"n": n, "seed": seed, "python": sys.version.split()[0],
+                              "machine": platform.machine(), "swaps": {}}
+    for swaps in swap_counts:
+        corpus = build_corpus(n, seed, swaps)
+        report["swaps"][str(swaps)] = {name: run_stage(stage, corpus) for name, stage in STAGES.items()}
+    return report
+
+
+def compare_searches(n: int, seed: int = 0, swaps: int = 10) -> Dict[str, Any]:
+    """
+    Runs every swap search on n puzzles shuffled with swaps random swaps.
+    :return: For each search, time (seconds) and expanded states summaries, and total path length
+    """
+    corpus = build_corpus(n, seed, swaps)
+    report = {}
+    for name, search in SEARCHES.items():
+        times, expansions, moves = [], [], 0
+        for waffle in corpus:
+            goal = grid_to_grid_string(waffle.true_grid)
+            start = SimplifiedWaffle(grid_to_grid_string(waffle.shuffled_grid), goal=goal)
+            stats = SolveStats()
+            begin = time.perf_counter()
+            path = search(start, SimplifiedWaffle(goal, goal=goal), stats=stats)
+            times.append(time.perf_counter() - begin)
+            expansions.append(stats.expanded)
+            moves += len(path) - 1
+        report[name] = {"seconds": summary(times), "expanded": summary(expansions), "moves": moves}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the solving pipeline on a corpus of puzzles.")
+    parser.add_argument("n", type=int, help="number of puzzles per corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--swaps", type=int, nargs="+", default=None,
+                        help="random swaps used to shuffle each grid, one corpus per value, 5 10 15 by default")
+    parser.add_argument("--searches", action="store_true",
+                        help="compare the swap searches instead, on the first number of swaps, 10 by default")
+    parser.add_argument("--output", default="-", help="output file, standard output by default")
+    args = parser.parse_args()
+
+    if args.searches:
+        result = compare_searches(args.n, args.seed, args.swaps[0] if args.swaps else 10)
+    else:
+        result = benchmark(args.n, args.seed, args.swaps or [5, 10, 15])
+
+    if args.output == "-":
+        print(json.dumps(result, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,180 @@
+"""
+Compiled binary lexicon, opened with mmap so that loading it costs next to nothing and
+its pages are shared by every process reading it.
+
+Layout, little endian:
+
+    header     magic "WAFL", format version (u16), word length (u16), number of words N (u32),
+               lexicon version (16 ascii characters, see Lexicon.version)
+    words      N packed words of 5 ascii upper case letters
+    index      for each position, then each letter from A to Z, the bitset of the words having
+               that letter at that position, on ceil(N / 8) bytes (bit i standing for word i)
+    counts     for each word, the number of each letter from A to Z (26 u8)
+
+    python binary_lexicon.py words.txt words.bin
+"""
+import hashlib
+import mmap
+import struct
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Union
+from utils import load_data, LEXICON_PATH
+
+MAGIC = b"WAFL"
+FORMAT_VERSION = 1
+WORD_LENGTH = 5
+HEADER = struct.Struct("<4sHHI16s")
+# Files with this suffix are loaded as binary lexicons, see load_words
+BINARY_SUFFIX = ".bin"
+
+
+def lexicon_version(words: List[str]) -> str:
+    """
+    Same as Lexicon.version.
+    """
+    return hashlib.sha256('\n'.join(words).encode()).hexdigest()[:16]
+
+
+def compile_lexicon(words: List[str], path: str) -> None:
+    """
+    Writes words to a binary lexicon file.
+    :param words: 5-letters upper case words, as returned by load_data
+    :param path: Binary file written
+    """
+    for word in words:
+        if len(word) != WORD_LENGTH or not all('A' <= letter <= 'Z' for letter in word):
+            raise ValueError("Cannot compile {!r}: words must be 5 upper case letters".format(word))
+
+    size = (len(words) + 7) // 8
+    index = [[bytearray(size) for _ in range(26)] for _ in range(WORD_LENGTH)]
+    counts = bytearray(26 * len(words))
+
+    for i, word in enumerate(words):
+        byte, bit = i >> 3, 1 << (i & 7)
+        for position, letter in enumerate(word):
+            code = ord(letter) - ord('A')
+            index[position][code][byte] |= bit
+            counts[26 * i + code] += 1
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, WORD_LENGTH, len(words), lexicon_version(words).encode('ascii')))
+        f.write(''.join(words).encode('ascii'))
+        for bitsets in index:
+            for bitset in bitsets:
+                f.write(bitset)
+        f.write(counts)
+
+
+class BinaryWords(Sequence):
+    """
+    Read-only sequence of the words of a binary lexicon, decoded on access.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.buffer) < HEADER.size:
+            raise ValueError("{} is not a binary lexicon".format(path))
+        magic, format_version, word_length, count, version = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION or word_length != WORD_LENGTH:
+            raise ValueError("{} is not a binary lexicon of format {}".format(path, FORMAT_VERSION))
+
+        self.count: int = count
+        self.version: str = version.decode('ascii')
+        self.bitset_size: int = (count + 7) // 8
+        self.words_offset = HEADER.size
+        self.index_offset = self.words_offset + WORD_LENGTH * count
+        self.counts_offset = self.index_offset + WORD_LENGTH * 26 * self.bitset_size
+        if len(self.buffer) != self.counts_offset + 26 * count:
+            raise ValueError("{} is truncated".format(path))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("word index out of range")
+        start = self.words_offset + WORD_LENGTH * i
+        return self.buffer[start:start + WORD_LENGTH].decode('ascii')
+
+    def __iter__(self) -> Iterator[str]:
+        packed = self.packed().decode('ascii')
+        for start in range(0, len(packed), WORD_LENGTH):
+            yield packed[start:start + WORD_LENGTH]
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str) or len(word) != WORD_LENGTH:
+            return False
+        target = word.encode('ascii', errors='replace')
+        end = self.index_offset
+        start = self.buffer.find(target, self.words_offset, end)
+        while start != -1:
+            if (start - self.words_offset) % WORD_LENGTH == 0:
+                return True
+            start = self.buffer.find(target, start + 1, end)
+        return False
+
+    def packed(self) -> bytes:
+        """
+        Words of the lexicon, packed one after the other.
+        """
+        return self.buffer[self.words_offset:self.index_offset]
+
+    def position_index(self) -> List[Dict[str, int]]:
+        """
+        Same as lexicon.build_position_index, read from the file.
+        """
+        index: List[Dict[str, int]] = [{} for _ in range(WORD_LENGTH)]
+        offset = self.index_offset
+        for position in range(WORD_LENGTH):
+            for code in range(26):
+                bitset = int.from_bytes(self.buffer[offset:offset + self.bitset_size], 'little')
+                if bitset:
+                    index[position][chr(ord('A') + code)] = bitset
+                offset += self.bitset_size
+        return index
+
+    def letter_counts(self, i: int) -> bytes:
+        """
+        Number of each letter, from A to Z, in word i.
+        """
+        start = self.counts_offset + 26 * i
+        return self.buffer[start:start + 26]
+
+    def close(self) -> None:
+        self.buffer.close()
+
+
+def load_binary(path: str) -> BinaryWords:
+    """
+    Opens a binary lexicon. Drop-in for load_data: words are upper case 5-letters strings.
+    """
+    return BinaryWords(path)
+
+
+def load_words(path: str = LEXICON_PATH) -> Union[List[str], BinaryWords]:
+    """
+    Loads a lexicon, binary if path ends with BINARY_SUFFIX, text otherwise.
+    """
+    if path.endswith(BINARY_SUFFIX):
+        return load_binary(path)
+    return load_data(path)
+
+
+if __name__ == "__main__":
+    # Only imported here: the lexicon, hence this module, is on the startup path of every solve
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compiles a words file to a binary lexicon.")
+    parser.add_argument("source", nargs="?", default=LEXICON_PATH, help="words file, words.txt by default")
+    parser.add_argument("target", nargs="?", default=None, help="binary file, the words file with .bin by default")
+    args = parser.parse_args()
+
+    target = args.target or args.source.rsplit('.', 1)[0] + BINARY_SUFFIX
+    compile_lexicon(load_data(args.source), target)
+    print("Compiled {} to {}".format(args.source, target))
@@ -0,0 +1,148 @@
+"""
+Cache of solved waffles, so that puzzles seen before (daily puzzle, retries, replays)
+are not solved again.
+
+Entries are keyed by a fingerprint of the shuffled grid string, the diff string and
+a version: changing words.txt or the solver (see SOLVER_VERSION) changes the version,
+and entries of other versions are dropped when the cache is opened. Words of the solution and swap paths
+are stored separately, a least recently used set of entries being kept in memory in
+front of an optional sqlite file shared by processes.
+"""
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, List, Optional, Tuple
+from lexicon import Lexicon, get_lexicon
+from utils import grid_string_to_words, words_to_grid, words_to_grid_string, diff_from_string
+from waffle_path import min_swaps
+from waffle_solver import Deadline, WaffleSolver, SOLVER_VERSION
+
+WORDS = "words"
+SWAPS = "swaps"
+
+
+class SolutionCache:
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 4096, lexicon: Optional[Lexicon] = None):
+        """
+        :param path: sqlite file, entries only being kept in memory if None
+        :param max_entries: Maximum number of entries kept in memory
+        :param lexicon: Lexicon the solutions come from, the shared one by default
+        """
+        self.version: str = "{}.{}".format((lexicon or get_lexicon()).version, SOLVER_VERSION)
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.connection: Optional[sqlite3.Connection] = None
+
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=30)
+            with self.connection:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (fingerprint TEXT, kind TEXT, "
+                                        "version TEXT, value TEXT, PRIMARY KEY (fingerprint, kind))")
+                self.connection.execute("DELETE FROM solutions WHERE version != ?", (self.version,))
+
+    def fingerprint(self, shuffled: str, diff: str) -> str:
+        return hashlib.sha256("{}|{}|{}".format(shuffled.upper(), diff, self.version).encode()).hexdigest()
+
+    def get(self, kind: str, shuffled: str, diff: str) -> Optional[Any]:
+        """
+        :return: Value stored for the puzzle, None if there is none
+        """
+        key = (self.fingerprint(shuffled, diff), kind)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+
+        if self.connection is not None:
+            row = self.connection.execute("SELECT value FROM solutions WHERE fingerprint = ? AND kind = ?",
+                                          key).fetchone()
+            if row is not None:
+                self.hits += 1
+                value = json.loads(row[0])
+                self.remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, kind: str, shuffled: str, diff: str, value: Any) -> None:
+        """
+        Stores a JSON serializable value for the puzzle.
+        """
+        key = (self.fingerprint(shuffled, diff), kind)
+        self.remember(key, value)
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                        key + (self.version, json.dumps(value)))
+
+    def remember(self, key: Tuple[str, str], value: Any) -> None:
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def solve_words(shuffled: str, diff: str, cache: Optional[SolutionCache] = None,
+                deadline: Optional[float] = None, lexicon: Optional[Lexicon] = None) -> Tuple[List[str], Optional[bool]]:
+    """
+    Words solving a shuffled waffle, looked up in the cache first.
+    :param shuffled: Shuffled grid string
+    :param diff: Diff string
+    :param deadline: Time by which the search gives up, as given by time.time, unbounded if None
+    :param lexicon: Lexicon to look words up in, the shared one by default. Should be the one of cache
+    :return: Words of the first solution, and whether other solutions exist, None if the deadline
+    was reached before this was known (such results are not cached)
+    :raise TimeoutError: When the deadline is reached before a solution is found
+    """
+    if cache is not None:
+        value = cache.get(WORDS, shuffled, diff)
+        if value is not None:
+            return value["words"], value["ambiguous"]
+
+    solver = WaffleSolver(words_to_grid(grid_string_to_words(shuffled)), diff_from_string(diff), lexicon=lexicon)
+    if deadline is not None:
+        solver.stop = Deadline(deadline)
+    solutions = list(islice(solver.iter_solutions(), 2))
+    if len(solutions) < 2 and solver.stop is not None and solver.stop.is_set():
+        if not solutions:
+            raise TimeoutError("Deadline reached while looking for words")
+        return solutions[0], None
+    if not solutions:
+        raise ValueError("No solution found")
+
+    if cache is not None:
+        cache.put(WORDS, shuffled, diff, {"words": solutions[0], "ambiguous": len(solutions) > 1})
+    return solutions[0], len(solutions) > 1
+
+
+def solve_swaps(shuffled: str, diff: str, words: List[str],
+                cache: Optional[SolutionCache] = None) -> List[Tuple[int, int]]:
+    """
+    Shortest swap sequence from a shuffled waffle to its solution, looked up in the cache first.
+    :param shuffled: Shuffled grid string
+    :param diff: Diff string
+    :param words: Words of the solution
+    """
+    if cache is not None:
+        value = cache.get(SWAPS, shuffled, diff)
+        if value is not None and value["goal"] == words_to_grid_string(words):
+            return [tuple(s) for s in value["swaps"]]
+
+    goal = words_to_grid_string(words)
+    swaps = min_swaps(shuffled.upper(), goal)
+
+    if cache is not None:
+        cache.put(SWAPS, shuffled, diff, {"goal": goal, "swaps": swaps})
+    return swaps
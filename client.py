@@ -0,0 +1,61 @@
+"""
+Client of the local solve service (see server.py).
+
+    python client.py ROAALAAOELTBVNUITIEIN 021002221201222102220
+"""
+import argparse
+import http.client
+import json
+from typing import Any, Dict, Optional
+from server import DEFAULT_PORT
+
+
+class SolveClient:
+    """
+    Keeps one connection to the service open across requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, timeout: float = 30.0):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        :return: Decoded answer, with the HTTP status under "status"
+        """
+        body = None if payload is None else json.dumps(payload)
+        self.connection.request(method, path, body, {"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        answer = json.loads(response.read())
+        answer["status"] = response.status
+        return answer
+
+    def solve(self, shuffled: str, diff: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        :param shuffled: Shuffled grid string
+        :param diff: Diff string
+        :param deadline: Time allowed to the solve in seconds, the server default if None
+        """
+        payload: Dict[str, Any] = {"shuffled": shuffled, "diff": diff}
+        if deadline is not None:
+            payload["deadline"] = deadline
+        return self.request("POST", "/solve", payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("GET", "/stats")
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solves a shuffled waffle with the local solve service.")
+    parser.add_argument("shuffled", help="shuffled grid string")
+    parser.add_argument("diff", help="diff string")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--deadline", type=float, default=None)
+    args = parser.parse_args()
+
+    client = SolveClient(args.host, args.port)
+    print(json.dumps(client.solve(args.shuffled, args.diff, args.deadline), indent=2))
+    client.close()
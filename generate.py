@@ -0,0 +1,110 @@
+"""
+Bulk generation of waffle puzzles, written as JSON lines:
+
+    {"index": 0, "grid": "LABOROEESPIELENARUGBY", "shuffled": "...", "diff": "000002020002102201200"}
+
+Puzzle i only depends on (seed, i), so a corpus is reproducible whatever the
+number of workers. Puzzles are streamed in completion order, with a bounded
+number of chunks in flight.
+
+    python generate.py 100000 --seed 42 --workers 8 --output puzzles.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Generator, List, Optional, Union
+from lexicon import get_lexicon
+from parallel import bounded_submit
+from utils import LEXICON_PATH, grid_to_grid_string
+from waffle import Waffle
+
+# Puzzles built by a worker per task
+CHUNK_SIZE = 64
+# Tasks submitted per worker before waiting for results
+IN_FLIGHT_PER_WORKER = 4
+
+
+def puzzle_rng(seed: int, index: int) -> random.Random:
+    """
+    Random generator of puzzle index, derived from the corpus seed.
+    """
+    return random.Random(f"{seed}:{index}")
+
+
+def make_puzzle(seed: int, index: int, swaps: int = 10,
+                lexicon_path: str = LEXICON_PATH) -> Dict[str, Union[int, str]]:
+    """
+    Builds puzzle index of the corpus generated from seed.
+    :param swaps: Number of random swaps used to shuffle the grid
+    :param lexicon_path: Words file or binary lexicon the words are taken from
+    """
+    waffle = Waffle(rng=puzzle_rng(seed, index), lexicon=get_lexicon(lexicon_path))
+    waffle.shuffle_grid(swaps)
+    return {"index": index,
+            "grid": grid_to_grid_string(waffle.true_grid),
+            "shuffled": grid_to_grid_string(waffle.shuffled_grid),
+            "diff": grid_to_grid_string(waffle.diff)}
+
+
+def make_puzzles(seed: int, start: int, stop: int, swaps: int = 10,
+                 lexicon_path: str = LEXICON_PATH) -> List[Dict[str, Union[int, str]]]:
+    return [make_puzzle(seed, index, swaps, lexicon_path) for index in range(start, stop)]
+
+
+def generate(n: int, seed: int = 0, workers: Optional[int] = None, swaps: int = 10,
+             lexicon_path: str = LEXICON_PATH) -> Generator[Dict[str, Union[int, str]], None, None]:
+    """
+    Generates n puzzles across a pool of processes.
+    :param n: Number of puzzles
+    :param seed: Seed of the corpus
+    :param workers: Number of processes, all cores by default. With 1, puzzles are built in this process.
+    :param swaps: Number of random swaps used to shuffle each grid
+    :param lexicon_path: Words file or binary lexicon the words are taken from
+    :return: Puzzles, in completion order
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for index in range(n):
+            yield make_puzzle(seed, index, swaps, lexicon_path)
+        return
+
+    chunks = ((start, min(start + CHUNK_SIZE, n)) for start in range(0, n, CHUNK_SIZE))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = ((seed, start, stop, swaps, lexicon_path) for start, stop in chunks)
+        for future in bounded_submit(executor, make_puzzles, tasks, workers * IN_FLIGHT_PER_WORKER):
+            yield from future.result()
+
+
+def write_jsonl(puzzles, output) -> int:
+    """
+    Writes puzzles to an open file, one JSON object per line.
+    :return: Number of puzzles written
+    """
+    count = 0
+    for puzzle in puzzles:
+        output.write(json.dumps(puzzle) + '\n')
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates waffle puzzles as JSON lines.")
+    parser.add_argument("n", type=int, help="number of puzzles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, all cores by default")
+    parser.add_argument("--swaps", type=int, default=10, help="random swaps used to shuffle each grid")
+    parser.add_argument("--lexicon", default=LEXICON_PATH, help="words file or binary lexicon, words.txt by default")
+    parser.add_argument("--output", default="-", help="output file, standard output by default")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        write_jsonl(generate(args.n, args.seed, args.workers, args.swaps, args.lexicon), sys.stdout)
+    else:
+        with open(args.output, "w") as f:
+            write_jsonl(generate(args.n, args.seed, args.workers, args.swaps, args.lexicon), f)
@@ -0,0 +1,129 @@
+"""
+Shared word list used by the generator and the solver.
+
+The lexicon is loaded once per process (see get_lexicon) and keeps, for every
+(position, letter) pair, the set of words having that letter at that position.
+Sets are stored as bitsets (python ints, bit i standing for word i), so that
+matching a per-position constraint boils down to a few OR / AND operations.
+
+Compiled binary lexicons (see binary_lexicon) come with their bitsets, and their
+words stay in the memory-mapped file.
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+from binary_lexicon import BinaryWords, lexicon_version, load_words
+from utils import LEXICON_PATH
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class Lexicon:
+
+    def __init__(self, words: Sequence[str]):
+        """
+        :param words: Upper case 5-letters words, as a list or read from a binary lexicon
+        """
+        self.words: Sequence[str] = words
+        self.all: int = (1 << len(words)) - 1
+        if isinstance(words, BinaryWords):
+            self.version: str = words.version
+            self.position_index: List[Dict[str, int]] = words.position_index()
+        else:
+            # Changes whenever the words change, to tell apart results computed with another lexicon
+            self.version = lexicon_version(words)
+            # position_index[p][letter] is the bitset of words having letter at position p
+            self.position_index = build_position_index(words)
+        self._array: Optional['np.ndarray'] = None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @property
+    def array(self) -> 'np.ndarray':
+        """
+        (N, 5) uint8 array of the words, letters being encoded from 0 (A) to 25 (Z).
+        Built on first access, for vectorized filtering: only then is NumPy imported.
+        """
+        if self._array is None:
+            self._array = words_to_array(self.words)
+        return self._array
+
+    def with_letter(self, position: int, letter: str) -> int:
+        """
+        :return: Bitset of words having letter at the given position.
+        """
+        return self.position_index[position].get(letter, 0)
+
+    def with_letters(self, position: int, letters: Iterable[str]) -> int:
+        """
+        :return: Bitset of words having any of the letters at the given position.
+        """
+        output = 0
+        index = self.position_index[position]
+        for letter in letters:
+            output |= index.get(letter, 0)
+        return output
+
+    def match_bits(self, constraint: List[Iterable[str]]) -> int:
+        """
+        Bitset of the words matching a constraint, i.e. a list of 5 sets of allowed letters.
+        """
+        bits = self.all
+        for position, letters in enumerate(constraint):
+            bits &= self.with_letters(position, letters)
+            if not bits:
+                break
+        return bits
+
+    def match(self, constraint: List[Iterable[str]]) -> List[str]:
+        """
+        Words matching a constraint, in lexicon order.
+        """
+        return self.words_from_bits(self.match_bits(constraint))
+
+    def words_from_bits(self, bits: int) -> List[str]:
+        return [self.words[i] for i in bits_to_indexes(bits)]
+
+
+def build_position_index(words: List[str]) -> List[Dict[str, int]]:
+    """
+    Builds the (position, letter) -> bitset index of a list of 5-letters words.
+    """
+    size = (len(words) + 7) // 8
+    buffers: List[Dict[str, bytearray]] = [{} for _ in range(5)]
+
+    for i, word in enumerate(words):
+        byte, bit = i >> 3, 1 << (i & 7)
+        for position, letter in enumerate(word):
+            if letter not in buffers[position]:
+                buffers[position][letter] = bytearray(size)
+            buffers[position][letter][byte] |= bit
+
+    return [{letter: int.from_bytes(buffer, 'little') for letter, buffer in index.items()} for index in buffers]
+
+
+def words_to_array(words: Sequence[str]) -> 'np.ndarray':
+    """
+    Encodes 5-letters words as an (N, 5) uint8 array, A being 0 and Z 25.
+    """
+    import numpy as np
+    packed = words.packed() if isinstance(words, BinaryWords) else ''.join(words).encode('ascii')
+    raw = np.frombuffer(packed, dtype=np.uint8)
+    return (raw - ord('A')).reshape(len(words), 5)
+
+
+def bits_to_indexes(bits: int) -> List[int]:
+    """
+    Lists the indexes of the bits set in a bitset, in increasing order.
+    """
+    return [i for i, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1'] if bits else []
+
+
+@lru_cache(maxsize=None)
+def get_lexicon(path: str = LEXICON_PATH) -> Lexicon:
+    """
+    Returns the lexicon stored at path, loading it only on the first call.
+    :param path: Words file, or binary lexicon if it ends with binary_lexicon.BINARY_SUFFIX
+    """
+    return Lexicon(load_words(path))
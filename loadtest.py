@@ -0,0 +1,67 @@
+"""
+Load test of the local solve service: sends a seeded corpus of puzzles from
+several concurrent clients, and reports client and server side latencies.
+
+    python main.py serve &
+    python loadtest.py 2000 --concurrency 8
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from client import SolveClient
+from generate import generate
+from server import DEFAULT_PORT
+from utils import percentile
+
+
+def load_test(n: int, concurrency: int = 4, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+              seed: int = 0, swaps: int = 10) -> Dict[str, Any]:
+    """
+    Sends n puzzles from concurrency clients.
+    :return: Throughput, client side latencies in seconds, status counts and server stats
+    """
+    puzzles = list(generate(n, seed, workers=1, swaps=swaps))
+    shares = [puzzles[i::concurrency] for i in range(concurrency)]
+
+    def run(share: List[Dict[str, Any]]) -> List[tuple]:
+        client = SolveClient(host, port)
+        measures = []
+        for puzzle in share:
+            start = time.perf_counter()
+            answer = client.solve(puzzle["shuffled"], puzzle["diff"])
+            measures.append((time.perf_counter() - start, answer["status"]))
+        client.close()
+        return measures
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        measures = [m for share in executor.map(run, shares) for m in share]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in measures]
+    statuses: Dict[str, int] = {}
+    for _, status in measures:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    client = SolveClient(host, port)
+    server_stats = client.stats()
+    client.close()
+
+    return {"requests": n, "seconds": elapsed, "throughput": n / elapsed if elapsed else 0.0,
+            "latency": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                        "p99": percentile(latencies, 99)},
+            "statuses": statuses, "server": server_stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the local solve service.")
+    parser.add_argument("n", type=int, help="number of requests")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(load_test(args.n, args.concurrency, args.host, args.port, args.seed), indent=2))
@@ -1,19 +1,98 @@
 """
 A Waffle Game solver
 """
+import argparse
+import json
+from typing import Any, Dict, List, Tuple
+from lexicon import get_lexicon
+from stats import SolveStats
 from waffle_game import WaffleGame
+from waffle_path import SimplifiedWaffle, a_star, min_swaps, path_swaps
+from waffle_solver import WaffleSolver as WordsSolver
+from utils import LEXICON_PATH, grid_to_grid_string, GRID_CELLS, diff_from_string, grid_string_to_words, words_to_grid, \
+    words_to_grid_string
+
+# Functions listed in the profile summary
+PROFILE_LINES = 20
 
 
 class WaffleSolver:
     def __init__(self, waffle):
         self.waffle = waffle
 
-    def minimum_moves(self):
-        pass
+    def minimum_moves(self) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Shortest sequence of swaps turning the shuffled grid of the waffle into its solution.
+        :return: Pairs of grid positions to swap, in order
+        """
+        swaps = min_swaps(grid_to_grid_string(self.waffle.shuffled_grid), grid_to_grid_string(self.waffle.true_grid))
+        return [(GRID_CELLS[i], GRID_CELLS[j]) for i, j in swaps]
 
     def solve(self):
         pass
 
 
+def solve_puzzle(shuffled: str, diff: str, lexicon_path: str = LEXICON_PATH) -> Dict[str, Any]:
+    """
+    Solves a shuffled waffle, counting the work of each solver.
+    :param shuffled: Shuffled grid string
+    :param diff: Diff string
+    :param lexicon_path: Words file or binary lexicon the words are looked up in
+    :return: Words of the solution, shortest swap sequence, and stats of both solvers
+    """
+    shuffled = shuffled.upper()
+    words_stats, path_stats = SolveStats(), SolveStats()
+    solver = WordsSolver(words_to_grid(grid_string_to_words(shuffled)), diff_from_string(diff), stats=words_stats,
+                         lexicon=get_lexicon(lexicon_path))
+    solver.solve()
+    if not all(solver.solution):
+        raise ValueError("No solution found")
+
+    goal = words_to_grid_string(solver.solution)
+    path = a_star(SimplifiedWaffle(shuffled, goal=goal), SimplifiedWaffle(goal, goal=goal), stats=path_stats)
+    return {"words": solver.solution, "swaps": [list(s) for s in path_swaps(path)],
+            "stats": {"words": words_stats.as_dict(), "path": path_stats.as_dict()}}
+
+
 if __name__ == "__main__":
-    w = WaffleGame()
+    parser = argparse.ArgumentParser(description="A Waffle Game solver. Starts a game without a command.")
+    commands = parser.add_subparsers(dest="command")
+
+    serve_parser = commands.add_parser("serve", help="run the local solve service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=None, help="server.DEFAULT_PORT by default")
+    serve_parser.add_argument("--workers", type=int, default=None, help="solving processes, all cores by default")
+    serve_parser.add_argument("--deadline", type=float, default=5.0, help="default time allowed per solve, in seconds")
+    serve_parser.add_argument("--cache", default=None, help="sqlite file caching solutions")
+    serve_parser.add_argument("--lexicon", default=LEXICON_PATH, help="words file or binary lexicon")
+
+    solve_parser = commands.add_parser("solve", help="solve a shuffled waffle")
+    solve_parser.add_argument("shuffled", help="shuffled grid string")
+    solve_parser.add_argument("diff", help="diff string")
+    solve_parser.add_argument("--lexicon", default=LEXICON_PATH, help="words file or binary lexicon")
+    solve_parser.add_argument("--profile", action="store_true", help="add a cProfile summary to the solver stats")
+
+    args = parser.parse_args()
+
+    # The service and the profiler are only imported by the commands using them, to keep solves quick to start
+    if args.command == "serve":
+        from server import serve, DEFAULT_PORT
+        port = DEFAULT_PORT if args.port is None else args.port
+        serve(args.host, port, args.workers, args.deadline, args.cache, args.lexicon)
+    elif args.command == "solve" and not args.profile:
+        result = solve_puzzle(args.shuffled, args.diff, args.lexicon)
+        print(json.dumps({"words": result["words"], "swaps": result["swaps"]}))
+    elif args.command == "solve":
+        import cProfile
+        import io
+        import pstats
+
+        profile = cProfile.Profile()
+        result = profile.runcall(solve_puzzle, args.shuffled, args.diff, args.lexicon)
+        print(json.dumps({"words": result["words"], "swaps": result["swaps"]}))
+        print(json.dumps(result["stats"], indent=2))
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        print(summary.getvalue())
+    else:
+        w = WaffleGame()
@@ -0,0 +1,25 @@
+"""
+Helpers to run many tasks over a process pool without queuing them all at once.
+"""
+from concurrent.futures import Executor, Future, FIRST_COMPLETED, wait
+from typing import Callable, Generator, Iterable
+
+
+def bounded_submit(executor: Executor, function: Callable, tasks: Iterable[tuple],
+                   max_in_flight: int) -> Generator[Future, None, None]:
+    """
+    Submits function(*task) for every task, keeping at most max_in_flight tasks submitted
+    and not yet returned. Tasks are only read from the iterable when there is room for them,
+    so memory stays bounded whatever their number.
+    :return: Futures of the tasks, in completion order
+    """
+    pending = set()
+    for task in tasks:
+        pending.add(executor.submit(function, *task))
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from done
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        yield from done
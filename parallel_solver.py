@@ -0,0 +1,153 @@
+"""
+Solves a single puzzle over a pool of processes, for lexicons large enough that one
+search takes seconds.
+
+The search tree is split into subtrees: the first slots of the search, at most SPLIT_DEPTH of
+them, are expanded one at a time until there are at least as many partial solutions (prefixes)
+as tasks. The split is computed once, by the calling process, and task k of n receives prefixes
+k, k + n, k + 2n... (interleaved, so that every task gets words from the whole lexicon). Workers
+load the lexicon once, in the pool initializer, and only receive grid strings and their prefixes.
+In first solution mode, the first solution found sets an event shared with every worker: queued
+tasks are cancelled, and running ones return at their next candidate of the first two slots
+below their prefix, or within STOP_CHECK_INTERVAL candidates deeper down.
+
+    with ParallelSolver(workers=8) as solver:
+        words = solver.solve(shuffled_grid, diff)
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, List, Optional, Tuple
+from lexicon import Lexicon, get_lexicon
+from utils import LEXICON_PATH, Grid, grid_to_grid_string, grid_string_to_words, words_to_grid, diff_from_string
+from waffle_solver import WaffleSolver
+
+# Tasks per worker, more tasks balancing better subtrees of uneven sizes
+TASKS_PER_WORKER = 4
+# Slots split_search expands at most
+SPLIT_DEPTH = 2
+
+# Set in each worker by init_worker
+_stop: Optional[Any] = None
+_lexicon: Optional[Lexicon] = None
+# Solver of the last puzzle seen by the worker, by (shuffled, diff) grid strings
+_solver: Optional[Tuple[Tuple[str, str], WaffleSolver]] = None
+
+
+def init_worker(stop: Any, lexicon_path: str = LEXICON_PATH) -> None:
+    """
+    Loads the lexicon and its indexes once per worker, and keeps the shared stop event.
+    """
+    global _stop, _lexicon
+    _stop = stop
+    _lexicon = get_lexicon(lexicon_path)
+
+
+def worker_solver(shuffled: str, diff: str) -> WaffleSolver:
+    """
+    Solver of a puzzle, built once per worker and puzzle.
+    """
+    global _solver
+    if _solver is None or _solver[0] != (shuffled, diff):
+        solver = WaffleSolver(words_to_grid(grid_string_to_words(shuffled)), diff_from_string(diff), lexicon=_lexicon)
+        solver.stop = _stop
+        _solver = ((shuffled, diff), solver)
+    return _solver[1]
+
+
+def split_search(solver: WaffleSolver, tasks: int, max_depth: int = SPLIT_DEPTH) -> List[List[str]]:
+    """
+    Expands the first slots of the search until there are at least tasks subtrees.
+    :param max_depth: Maximum number of slots expanded
+    :return: Prefixes of the subtrees, all of the same length, in search order
+    """
+    prefixes: List[List[str]] = [[]]
+    while prefixes and len(prefixes) < tasks and len(prefixes[0]) < max_depth:
+        prefixes = [extended for prefix in prefixes for extended in solver.extensions(prefix)]
+    return prefixes
+
+
+def solve_task(shuffled: str, diff: str, prefixes: List[List[str]], first_only: bool) -> List[List[str]]:
+    """
+    Explores the subtrees of some prefixes of a puzzle search (see split_search).
+    :return: Solutions found, at most one in first solution mode
+    """
+    solver = worker_solver(shuffled, diff)
+    solutions = []
+    for prefix in prefixes:
+        if _stop is not None and _stop.is_set():
+            break
+        for solution in solver.iter_solutions(prefix):
+            solutions.append(solution)
+            if first_only:
+                return solutions
+    return solutions
+
+
+class ParallelSolver:
+    """
+    Pool of processes solving puzzles one at a time, each over every worker.
+    """
+
+    def __init__(self, workers: Optional[int] = None, lexicon_path: str = LEXICON_PATH):
+        """
+        :param workers: Number of processes, all cores by default
+        :param lexicon_path: Words file or binary lexicon the words are looked up in
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.lexicon_path = lexicon_path
+        self.stop = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                            initargs=(self.stop, lexicon_path))
+
+    def __enter__(self) -> 'ParallelSolver':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def solutions(self, shuffled_grid: Grid, diff_matrix: Grid, first_only: bool = False) -> List[List[str]]:
+        """
+        Lists the solutions of a puzzle.
+        :param shuffled_grid: Grid of letters, as shown by the game
+        :param diff_matrix: Colors of the grid (0 green, 1 yellow, 2 black)
+        :param first_only: Stops every worker as soon as a solution is found
+        :return: Solutions, in task order, or the first one found in first solution mode
+        """
+        shuffled, diff = grid_to_grid_string(shuffled_grid).upper(), grid_to_grid_string(diff_matrix)
+        tasks = self.workers * TASKS_PER_WORKER
+        solver = WaffleSolver(shuffled_grid, diff_matrix, lexicon=get_lexicon(self.lexicon_path))
+        prefixes = split_search(solver, tasks)
+        self.stop.clear()
+        futures = [self.executor.submit(solve_task, shuffled, diff, prefixes[task::tasks], first_only)
+                   for task in range(min(tasks, len(prefixes)))]
+
+        if not first_only:
+            return [solution for future in futures for solution in future.result()]
+
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    solutions = future.result()
+                    if solutions:
+                        return solutions[:1]
+            return []
+        finally:
+            self.stop.set()
+            for future in pending:
+                future.cancel()
+            # Running tasks return at their next check of the event, before the next puzzle clears it
+            wait(pending)
+
+    def solve(self, shuffled_grid: Grid, diff_matrix: Grid) -> List[str]:
+        """
+        Looks for a solution, as WaffleSolver.solve does.
+        :return: Words of the first solution found, empty slots if there is none
+        """
+        solutions = self.solutions(shuffled_grid, diff_matrix, first_only=True)
+        return solutions[0] if solutions else ['' for _ in range(6)]
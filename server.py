@@ -0,0 +1,183 @@
+"""
+Local solve service, keeping the lexicon and its indexes warm between requests.
+
+A small HTTP/1.1 server built on asyncio streams:
+
+    POST /solve   {"shuffled": "...", "diff": "...", "deadline": 0.5}
+                  -> the result of batch.solve_record, 504 once the deadline is exceeded
+    GET  /stats   -> number of requests and latency percentiles, in seconds
+    GET  /health  -> {"status": "ok"}
+
+Solves are CPU-bound and run in a pool of processes. A solve exceeding its deadline is
+answered with 504 right away. The deadline is also given to the worker, whose word search
+gives up once it is reached (see cache.solve_words): a timed out solve, or one still queued
+at its deadline, frees its worker shortly after.
+
+    python main.py serve --port 8421 --workers 4
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Optional, Tuple
+from batch import solve_record, warm_worker
+from utils import LEXICON_PATH, percentile
+
+DEFAULT_PORT = 8421
+# Latencies kept to compute percentiles
+LATENCY_WINDOW = 10000
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 504: "Gateway Timeout"}
+
+
+class SolveServer:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: Optional[int] = None,
+                 deadline: float = 5.0, cache_path: Optional[str] = None, lexicon_path: str = LEXICON_PATH):
+        """
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 to pick a free one
+        :param workers: Number of solving processes, all cores by default
+        :param deadline: Default time allowed per solve, in seconds
+        :param cache_path: sqlite file of the solution cache, no cache if None
+        :param lexicon_path: Words file or binary lexicon the words are looked up in
+        """
+        self.host = host
+        self.port = port
+        self.deadline = deadline
+        self.cache_path = cache_path
+        self.lexicon_path = lexicon_path
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker,
+                                            initargs=(cache_path, lexicon_path))
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.counts: Dict[str, int] = {"requests": 0, "errors": 0, "timeouts": 0}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        # Workers are started and warmed up before the first request
+        await asyncio.get_running_loop().run_in_executor(self.executor, warm_worker, self.cache_path,
+                                                                   self.lexicon_path)
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of a connection, until the client closes it.
+        """
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                status, payload = await self.route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == "/solve":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            return await self.solve(body)
+        if path == "/stats":
+            return 200, self.stats()
+        if path == "/health":
+            return 200, {"status": "ok"}
+        return 404, {"error": "Unknown path {}".format(path)}
+
+    async def solve(self, body: bytes) -> Tuple[int, Any]:
+        start = time.perf_counter()
+        self.counts["requests"] += 1
+        try:
+            record = json.loads(body)
+            deadline = float(record.pop("deadline", self.deadline))
+        except (ValueError, AttributeError, TypeError) as e:
+            self.counts["errors"] += 1
+            return 400, {"error": "Invalid request: {}".format(e)}
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(loop.run_in_executor(self.executor, solve_record, record,
+                                                                 time.time() + deadline), deadline)
+            if result.get("error", "").startswith(TimeoutError.__name__):
+                # The worker reached the deadline just before this loop did
+                raise asyncio.TimeoutError
+        except asyncio.TimeoutError:
+            self.counts["timeouts"] += 1
+            return 504, {"error": "Deadline of {} s exceeded".format(deadline)}
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+        if "error" in result:
+            self.counts["errors"] += 1
+        return 200, result
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return dict(self.counts, latency={"p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                                          "p99": percentile(latencies, 99),
+                                          "max": max(latencies) if latencies else 0.0})
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """
+    Reads an HTTP request.
+    :return: Method, path, headers (lower case names) and body, None once the connection is closed
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, headers, body
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool = True) -> None:
+    body = json.dumps(payload).encode()
+    writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n"
+                 .format(status, REASONS.get(status, ""), len(body), "keep-alive" if keep_alive else "close")
+                 .encode("latin-1") + body)
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: Optional[int] = None,
+          deadline: float = 5.0, cache_path: Optional[str] = None, lexicon_path: str = LEXICON_PATH) -> None:
+    """
+    Runs the solve service until interrupted.
+    """
+    async def run():
+        server = SolveServer(host, port, workers, deadline, cache_path, lexicon_path)
+        await server.start()
+        print("Serving on http://{}:{}".format(server.host, server.port))
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
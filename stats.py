@@ -0,0 +1,65 @@
+"""
+Opt-in instrumentation of the solvers.
+
+A SolveStats object given to WaffleSolver or to a path search is filled with counters
+while it runs; solvers given none skip every measure.
+
+    stats = SolveStats(callback=lambda s: metrics.send(s.as_dict()))
+    WaffleSolver(shuffled_grid, diff, stats=stats).solve()
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Generator, Optional
+
+
+class SolveStats:
+    """
+    Counters of a solve:
+    - candidates: words tested by WaffleSolver
+    - intersection_prunes: words rejected by a shared cell, or already placed
+    - frequency_prunes: words rejected for lack of letters
+    - max_depth: deepest slot reached (1 to 6 words placed)
+    - expanded: states expanded by a path search
+    - max_frontier: largest number of states waiting to be expanded
+    - phases: wall time of each phase, in seconds
+    """
+
+    def __init__(self, callback: Optional[Callable[['SolveStats'], None]] = None):
+        """
+        :param callback: Called with these stats when a solve or a search completes
+        """
+        self.callback = callback
+        self.candidates = 0
+        self.intersection_prunes = 0
+        self.frequency_prunes = 0
+        self.max_depth = 0
+        self.expanded = 0
+        self.max_frontier = 0
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """
+        Adds the wall time of the block to phase name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self) -> None:
+        if self.callback is not None:
+            self.callback(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"candidates": self.candidates, "intersection_prunes": self.intersection_prunes,
+                "frequency_prunes": self.frequency_prunes, "max_depth": self.max_depth,
+                "expanded": self.expanded, "max_frontier": self.max_frontier, "phases": dict(self.phases)}
+
+
+def timed(stats: Optional[SolveStats], name: str) -> ContextManager:
+    """
+    Times a phase into stats, or does nothing if stats is None.
+    """
+    return nullcontext() if stats is None else stats.phase(name)
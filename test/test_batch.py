@@ -0,0 +1,35 @@
+import io
+import unittest
+from batch import read_records, solve_stream
+from generate import generate
+from utils import grid_string_to_words, words_to_grid_string
+from waffle_path import swap
+
+
+class TestBatch(unittest.TestCase):
+    def test_solves_records_and_reports_bad_ones(self):
+        puzzles = list(generate(10, seed=4, workers=1))
+        lines = [f'{{"index": {p["index"]}, "shuffled": "{p["shuffled"]}", "diff": "{p["diff"]}"}}' for p in puzzles]
+        lines += ['{"index": 10, "shuffled": "ABC", "diff": "0"}', 'not json', '[1, 2]', '5']
+
+        for workers in (1, 2):
+            results = {r.get("index", r.get("line")): r
+                       for r in solve_stream(read_records(io.StringIO('\n'.join(lines))), workers)}
+            self.assertEqual(len(results), 14)
+            for index in (10, 12, 13, 14):
+                self.assertIn("error", results[index])
+            for puzzle in puzzles:
+                result = results[puzzle["index"]]
+                self.assertEqual(result["words"], grid_string_to_words(puzzle["grid"]))
+                state = puzzle["shuffled"]
+                for i, j in result["swaps"]:
+                    state = swap(state.encode(), i, j).decode()
+                self.assertEqual(state, words_to_grid_string(result["words"]))
+
+    def test_reads_csv(self):
+        records = list(read_records(io.StringIO("id,shuffled,diff\na,ABC,012\n"), "csv"))
+        self.assertEqual(records, [{"id": "a", "shuffled": "ABC", "diff": "012"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import json
+import unittest
+from benchmark import STAGES, benchmark, build_corpus
+from utils import grid_to_grid_string
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_reproducible(self):
+        first = [grid_to_grid_string(waffle.shuffled_grid) for waffle in build_corpus(3, seed=7, swaps=5)]
+        second = [grid_to_grid_string(waffle.shuffled_grid) for waffle in build_corpus(3, seed=7, swaps=5)]
+        self.assertEqual(first, second)
+
+    def test_report_covers_every_stage(self):
+        report = json.loads(json.dumps(benchmark(2, seed=1, swap_counts=[5])))
+        self.assertEqual(set(report["swaps"]["5"]), set(STAGES))
+        self.assertIn("nodes", report["swaps"]["5"]["a_star"])
+        for stage in report["swaps"]["5"].values():
+            self.assertLessEqual(stage["seconds"]["p50"], stage["seconds"]["p95"])
+            self.assertGreater(stage["peak_memory"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
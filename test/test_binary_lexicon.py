@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from batch import solve_stream
+from binary_lexicon import BinaryWords, compile_lexicon, load_binary, load_words
+from generate import generate
+from lexicon import Lexicon, get_lexicon, words_to_array
+from utils import grid_string_to_words, load_data
+
+
+class TestBinaryLexicon(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "words.bin")
+        self.words = load_data()
+        compile_lexicon(self.words, self.path)
+        self.binary = load_binary(self.path)
+
+    def tearDown(self):
+        self.binary.close()
+        self.directory.cleanup()
+
+    def test_words_same_as_load_data(self):
+        self.assertEqual(len(self.binary), len(self.words))
+        self.assertEqual(list(self.binary), self.words)
+        self.assertEqual(self.binary[-1], self.words[-1])
+        self.assertIn(self.words[10], self.binary)
+        self.assertNotIn(self.words[10][1:] + self.words[11][0], self.binary)
+
+    def test_lexicon_same_as_from_text(self):
+        lexicon = Lexicon(self.binary)
+        text = get_lexicon()
+        self.assertEqual(lexicon.version, text.version)
+        self.assertEqual(lexicon.position_index, text.position_index)
+        constraint = [{'A', 'B'}, set('AEIOU'), set('RST'), set('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), {'E', 'S'}]
+        self.assertEqual(lexicon.match(constraint), text.match(constraint))
+        self.assertEqual(words_to_array(self.binary).tolist(), words_to_array(self.words).tolist())
+
+    def test_letter_counts(self):
+        for i in (0, 7, len(self.words) - 1):
+            counts = self.binary.letter_counts(i)
+            self.assertEqual(sum(counts), 5)
+            for letter in set(self.words[i]):
+                self.assertEqual(counts[ord(letter) - ord('A')], self.words[i].count(letter))
+
+    def test_load_words_by_suffix(self):
+        self.assertIsInstance(load_words(self.path), BinaryWords)
+        self.assertEqual(load_words(), self.words)
+
+    def test_workers_use_lexicon_path(self):
+        puzzle = next(generate(1, seed=3, workers=1))
+        solution = grid_string_to_words(puzzle["grid"])
+        partial = os.path.join(self.directory.name, "partial.bin")
+        compile_lexicon([word for word in self.words if word != solution[0]], partial)
+        records = [{"shuffled": puzzle["shuffled"], "diff": puzzle["diff"]}]
+
+        for workers in (1, 2):
+            self.assertEqual(next(solve_stream(records, workers, lexicon_path=self.path))["words"], solution)
+            self.assertIn("error", next(solve_stream(records, workers, lexicon_path=partial)))
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory.name, "other.bin")
+        with open(path, "wb") as f:
+            f.write(b"not a lexicon at all, only some bytes")
+        with self.assertRaises(ValueError):
+            load_binary(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
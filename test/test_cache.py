@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from cache import SolutionCache, solve_words, solve_swaps, WORDS
+from generate import generate
+from lexicon import Lexicon, get_lexicon
+from utils import diff_from_string, grid_string_to_words, words_to_grid
+from waffle_solver import WaffleSolver
+
+
+class CountingStop:
+    """
+    Stop event set once is_set was called more than limit times.
+    """
+
+    def __init__(self, limit=None):
+        self.calls = 0
+        self.limit = limit
+
+    def is_set(self):
+        self.calls += 1
+        return self.limit is not None and self.calls > self.limit
+
+
+class TestSolutionCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+        self.puzzle = next(generate(1, seed=9, workers=1))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_solutions_persist_across_instances(self):
+        cache = SolutionCache(self.path)
+        words, _ = solve_words(self.puzzle["shuffled"], self.puzzle["diff"], cache)
+        swaps = solve_swaps(self.puzzle["shuffled"], self.puzzle["diff"], words, cache)
+        self.assertEqual(words, grid_string_to_words(self.puzzle["grid"]))
+        cache.close()
+
+        cache = SolutionCache(self.path)
+        self.assertEqual(solve_words(self.puzzle["shuffled"], self.puzzle["diff"], cache)[0], words)
+        self.assertEqual(solve_swaps(self.puzzle["shuffled"], self.puzzle["diff"], words, cache), swaps)
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        cache.close()
+
+    def test_other_lexicon_invalidates_entries(self):
+        cache = SolutionCache(self.path)
+        cache.put(WORDS, self.puzzle["shuffled"], self.puzzle["diff"], {"words": [], "ambiguous": False})
+        cache.close()
+
+        cache = SolutionCache(self.path, lexicon=Lexicon(get_lexicon().words[:-1]))
+        self.assertIsNone(cache.get(WORDS, self.puzzle["shuffled"], self.puzzle["diff"]))
+        self.assertEqual(cache.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0], 0)
+        cache.close()
+
+    def test_memory_is_bounded(self):
+        cache = SolutionCache(max_entries=2)
+        for i in range(3):
+            cache.put(WORDS, str(i), "", i)
+        self.assertEqual(len(cache.memory), 2)
+        self.assertIsNone(cache.get(WORDS, "0", ""))
+
+    def test_deadline_stops_searches(self):
+        shuffled, diff = self.puzzle["shuffled"], self.puzzle["diff"]
+        with self.assertRaises(TimeoutError):
+            solve_words(shuffled, diff, deadline=time.time() - 1)
+
+        words, ambiguous = solve_words(shuffled, diff, deadline=time.time() + 60)
+        self.assertEqual(words, grid_string_to_words(self.puzzle["grid"]))
+        self.assertIsNotNone(ambiguous)
+
+    def test_deadline_after_first_solution_keeps_it(self):
+        shuffled, diff = self.puzzle["shuffled"], self.puzzle["diff"]
+        solver = WaffleSolver(words_to_grid(grid_string_to_words(shuffled)), diff_from_string(diff))
+        solver.stop = CountingStop()
+        with mock.patch("waffle_solver.STOP_CHECK_INTERVAL", 1):
+            next(solver.iter_solutions())
+            # The deadline is reached right after the first solution, while looking for a second one
+            with mock.patch("cache.Deadline", lambda end: CountingStop(solver.stop.calls)):
+                cache = SolutionCache()
+                words, ambiguous = solve_words(shuffled, diff, cache, deadline=0)
+        self.assertEqual(words, grid_string_to_words(self.puzzle["grid"]))
+        self.assertIsNone(ambiguous)
+        self.assertIsNone(cache.get(WORDS, shuffled, diff))
+
+if __name__ == '__main__':
+    unittest.main()
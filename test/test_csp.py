@@ -0,0 +1,31 @@
+import random
+import unittest
+from waffle import Waffle
+from waffle_solver import WaffleSolver
+from waffle_csp import CSPSolver
+
+
+class TestCSPSolver(unittest.TestCase):
+    def test_same_solution_as_waffle_solver(self):
+        random.seed(3)
+        for _ in range(5):
+            waffle = Waffle()
+            waffle.shuffle_grid(30)
+            solver = WaffleSolver(waffle.shuffled_grid, waffle.diff)
+            solver.solve()
+            csp = CSPSolver(waffle.shuffled_grid, waffle.diff)
+            csp.solve()
+            self.assertEqual(csp.solution, solver.solution)
+            self.assertGreater(csp.nodes, 0)
+
+    def test_enumerates_same_solutions_as_waffle_solver(self):
+        random.seed(4)
+        waffle = Waffle()
+        waffle.shuffle_grid(30)
+        expected = WaffleSolver(waffle.shuffled_grid, waffle.diff).iter_solutions()
+        found = CSPSolver(waffle.shuffled_grid, waffle.diff).iter_solutions()
+        self.assertEqual(sorted(found), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+from generate import generate
+from utils import get_diff, grid_to_grid_string, grid_string_to_words, words_to_grid
+
+
+class TestGenerate(unittest.TestCase):
+    def test_seeded_corpus_is_reproducible(self):
+        self.assertEqual(list(generate(10, seed=7, workers=1)), list(generate(10, seed=7, workers=1)))
+        self.assertNotEqual(list(generate(10, seed=7, workers=1)), list(generate(10, seed=8, workers=1)))
+
+    def test_same_corpus_whatever_the_workers(self):
+        parallel = sorted(generate(70, seed=7, workers=2), key=lambda puzzle: puzzle["index"])
+        self.assertEqual(parallel, list(generate(70, seed=7, workers=1)))
+
+    def test_diff_matches_grids(self):
+        for puzzle in generate(5, seed=1, workers=1):
+            diff = get_diff(words_to_grid(grid_string_to_words(puzzle["grid"])),
+                            words_to_grid(grid_string_to_words(puzzle["shuffled"])))
+            self.assertEqual(grid_to_grid_string(diff), puzzle["diff"])
+            self.assertEqual(sorted(puzzle["grid"]), sorted(puzzle["shuffled"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import unittest
+from lexicon import get_lexicon, bits_to_indexes
+from utils import load_data
+
+
+class TestLexicon(unittest.TestCase):
+    def test_loaded_once(self):
+        self.assertIs(get_lexicon(), get_lexicon())
+
+    def test_load_data_does_not_depend_on_cwd(self):
+        cwd = os.getcwd()
+        try:
+            os.chdir(os.path.dirname(cwd))
+            self.assertEqual(load_data(), get_lexicon().words)
+        finally:
+            os.chdir(cwd)
+
+    def test_match_same_as_scan(self):
+        lexicon = get_lexicon()
+        constraint = [set('ABCST'), set('AEIOU'), set('RLN'), set('ABCDEFGHIJKLM'), set('EY')]
+        expected = [w for w in lexicon.words if all(w[i] in constraint[i] for i in range(5))]
+        self.assertEqual(lexicon.match(constraint), expected)
+
+    def test_bits_to_indexes(self):
+        self.assertEqual(bits_to_indexes(0b101001), [0, 3, 5])
+        self.assertEqual(bits_to_indexes(0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
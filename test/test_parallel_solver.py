@@ -0,0 +1,77 @@
+import threading
+import unittest
+from unittest import mock
+from generate import generate
+from parallel_solver import ParallelSolver, split_search, SPLIT_DEPTH
+from utils import diff_from_string, grid_string_to_words, words_to_grid
+from waffle_solver import WaffleSolver
+
+
+def puzzle_grids(puzzle):
+    return words_to_grid(grid_string_to_words(puzzle["shuffled"])), diff_from_string(puzzle["diff"])
+
+
+class TestParallelSolver(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = ParallelSolver(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.solver.close()
+
+    def test_same_solutions_as_sequential_search(self):
+        for puzzle in generate(10, seed=8, workers=1, swaps=20):
+            grid, diff = puzzle_grids(puzzle)
+            expected = list(WaffleSolver(grid, diff).iter_solutions())
+            self.assertEqual(sorted(self.solver.solutions(grid, diff)), sorted(expected))
+            self.assertIn(self.solver.solve(grid, diff), expected)
+
+    def test_split_gives_work_to_several_tasks(self):
+        tasks = 8
+        wider = 0
+        for puzzle in generate(10, seed=8, workers=1, swaps=20):
+            solver = WaffleSolver(*puzzle_grids(puzzle))
+            prefixes = split_search(solver, tasks)
+            self.assertTrue(all(len(prefix) <= SPLIT_DEPTH for prefix in prefixes))
+            if prefixes and len(prefixes[0]) < SPLIT_DEPTH:
+                self.assertGreaterEqual(len(prefixes), tasks)
+            busy = sum(1 for task in range(tasks) if prefixes[task::tasks])
+            wider += busy > len(solver.candidates[0])
+            split = [solution for prefix in prefixes for solution in solver.iter_solutions(prefix)]
+            self.assertEqual(split, list(solver.iter_solutions()))
+        self.assertGreater(wider, 0)
+
+    def test_stop_event_ends_search(self):
+        grid, diff = puzzle_grids(next(generate(1, seed=8, workers=1)))
+        solver = WaffleSolver(grid, diff)
+        solver.stop = threading.Event()
+        solver.stop.set()
+        self.assertEqual(list(solver.iter_solutions()), [])
+
+    def test_stop_event_checked_below_prefix(self):
+        grid, diff = puzzle_grids(next(generate(1, seed=8, workers=1)))
+        solver = WaffleSolver(grid, diff)
+        prefix = next(solver.iter_solutions())[:SPLIT_DEPTH]
+        solver.stop = threading.Event()
+        solver.stop.set()
+        self.assertEqual(list(solver.iter_solutions(prefix)), [])
+
+    def test_stop_event_checked_at_every_depth(self):
+        grid, diff = puzzle_grids(next(generate(1, seed=8, workers=1)))
+        solver = WaffleSolver(grid, diff)
+        depths = []
+
+        class Stop:
+            def is_set(self):
+                depths.append(sum(1 for word in solver.solution if word))
+                return False
+
+        solver.stop = Stop()
+        with mock.patch("waffle_solver.STOP_CHECK_INTERVAL", 1):
+            list(solver.iter_solutions())
+        self.assertEqual(max(depths), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import random
+import tracemalloc
+import unittest
+from generate import generate
+from stats import SolveStats
+from waffle_path import SimplifiedWaffle, TranspositionTable, a_star, min_swaps, min_swap_count, swap, heuristic, \
+    cycle_heuristic, neighbours, anytime_search, bidirectional_search
+
+START = "BESOLIEENIKOAREADWROR"
+GOAL = "BROILOAOASKEWREEDINER"
+
+
+def is_swap(a: bytes, b: bytes) -> bool:
+    changed = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(changed) == 2 and a[changed[0]] == b[changed[1]] and a[changed[1]] == b[changed[0]]
+
+
+class TestPath(unittest.TestCase):
+    def test_state_is_21_bytes(self):
+        waffle = SimplifiedWaffle(START, goal=GOAL)
+        self.assertEqual(waffle.letters, START.encode())
+        self.assertEqual(len(waffle.diff), 21)
+        self.assertFalse(hasattr(waffle, '__dict__'))
+
+    def test_diff_depends_on_goal_of_the_search(self):
+        self.assertEqual(SimplifiedWaffle(GOAL, goal=GOAL).diff, b"0" * 21)
+        self.assertNotEqual(SimplifiedWaffle(START, goal=GOAL), SimplifiedWaffle(START, goal=START))
+
+    def test_a_star_path_is_made_of_swaps(self):
+        start = SimplifiedWaffle(START, goal=GOAL)
+        path = a_star(start, SimplifiedWaffle(GOAL, goal=GOAL))
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1].letters, GOAL.encode())
+        for a, b in zip(path, path[1:]):
+            self.assertTrue(is_swap(a.letters, b.letters))
+
+    def test_bounded_table_keeps_path_length(self):
+        start = SimplifiedWaffle(START, goal=GOAL)
+        goal = SimplifiedWaffle(GOAL, goal=GOAL)
+        bounded = a_star(start, goal, max_states=50)
+        self.assertEqual(bounded[-1].letters, GOAL.encode())
+        self.assertEqual(len(bounded), len(a_star(start, goal)))
+
+    def test_bounded_search_bounds_open_set(self):
+        for puzzle in generate(3, seed=3, workers=1, swaps=9):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            goal = SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"])
+            stats = SolveStats()
+            tracemalloc.start()
+            try:
+                path = a_star(start, goal, max_states=100, estimate=heuristic, stats=stats)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLessEqual(stats.max_frontier, 100)
+            self.assertLess(peak, 1 << 20)
+            self.assertEqual(len(path) - 1, min_swap_count(start.letters, goal.letters))
+
+    def test_transposition_table_evicts_least_recently_used(self):
+        table = TranspositionTable(max_size=2)
+        table.put(b"A", 1)
+        table.put(b"B", 1)
+        table.get(b"A")
+        table.put(b"C", 1)
+        self.assertEqual((table.get(b"A"), table.get(b"B"), len(table), table.evictions), (1, None, 2, 1))
+
+    def test_min_swaps_reaches_goal(self):
+        state = START.encode()
+        for i, j in min_swaps(START, GOAL):
+            state = swap(state, i, j)
+        self.assertEqual(state, GOAL.encode())
+        self.assertEqual(len(min_swaps(START, GOAL)), min_swap_count(START, GOAL))
+
+    def test_min_swaps_is_optimal(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            goal = ''.join(rng.choice('AABBC') for _ in range(7))
+            start = ''.join(rng.sample(goal, len(goal)))
+            self.assertEqual(len(min_swaps(start, goal)), breadth_first_distance(start.encode(), goal.encode()))
+
+    def test_cycle_heuristic_expands_fewer_states(self):
+        expanded = {heuristic: 0, cycle_heuristic: 0}
+        for puzzle in generate(10, seed=11, workers=1, swaps=5):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            goal = SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"])
+            self.assertLessEqual(cycle_heuristic(start, goal.letters), min_swap_count(start.letters, goal.letters))
+            for estimate in expanded:
+                stats = SolveStats()
+                path = a_star(start, goal, estimate=estimate, stats=stats)
+                self.assertEqual(len(path) - 1, min_swap_count(start.letters, goal.letters))
+                expanded[estimate] += stats.expanded
+        self.assertLess(expanded[cycle_heuristic], expanded[heuristic])
+
+    def test_neighbours_fix_at_least_one_cell(self):
+        goal = GOAL.encode()
+        fixed = [sum(a == b for a, b in zip(neighbour.letters, goal)) - sum(a == b for a, b in zip(START.encode(), goal))
+                 for neighbour in neighbours(SimplifiedWaffle(START, goal=GOAL), goal)]
+        self.assertTrue(fixed)
+        self.assertTrue(all(count >= 1 for count in fixed))
+        self.assertEqual(fixed, sorted(fixed, reverse=True))
+
+    def test_swapped_diff_same_as_full_diff(self):
+        rng = random.Random(1)
+        for puzzle in generate(20, seed=2, workers=1):
+            waffle = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            for _ in range(20):
+                i, j = sorted(rng.sample(range(21), 2))
+                waffle = waffle.swapped(i, j, puzzle["grid"].encode())
+                self.assertEqual(waffle.diff, SimplifiedWaffle(waffle.letters, goal=puzzle["grid"]).diff)
+
+
+    def test_anytime_search_without_budget_is_optimal(self):
+        for puzzle in generate(10, seed=4, workers=1, swaps=12):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            result = anytime_search(start, SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]), estimate=heuristic)
+            self.assertTrue(result.optimal)
+            self.assertEqual(result.moves, min_swap_count(start.letters, puzzle["grid"].encode()))
+
+    def test_anytime_search_out_of_budget_returns_a_path(self):
+        for puzzle in generate(10, seed=4, workers=1, swaps=12):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            result = anytime_search(start, SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]),
+                                    max_expansions=20, estimate=heuristic)
+            self.assertEqual(result.path[-1].letters, puzzle["grid"].encode())
+            for a, b in zip(result.path, result.path[1:]):
+                self.assertTrue(is_swap(a.letters, b.letters))
+            self.assertLessEqual(result.lower_bound, min_swap_count(start.letters, puzzle["grid"].encode()))
+            self.assertEqual(result.gap, result.moves - result.lower_bound)
+
+    def test_anytime_search_without_time_is_within_game_moves(self):
+        # Grids shuffled by 15 swaps, the game's number of moves
+        for puzzle in generate(30, seed=6, workers=1, swaps=15):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            result = anytime_search(start, SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]), deadline=0,
+                                    estimate=heuristic)
+            self.assertEqual(result.moves, min_swap_count(start.letters, puzzle["grid"].encode()))
+            self.assertLessEqual(result.moves, 15)
+
+
+    def test_bidirectional_search_is_optimal(self):
+        for puzzle in generate(10, seed=5, workers=1):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            path = bidirectional_search(start, SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]))
+            self.assertEqual(path[0], start)
+            self.assertEqual(path[-1], SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]))
+            for a, b in zip(path, path[1:]):
+                self.assertTrue(is_swap(a.letters, b.letters))
+            self.assertEqual(len(path) - 1, min_swap_count(start.letters, puzzle["grid"].encode()))
+
+    def test_bidirectional_search_out_of_states_falls_back(self):
+        for puzzle in generate(5, seed=5, workers=1, swaps=12):
+            start = SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"])
+            path = bidirectional_search(start, SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]), max_visited=10)
+            self.assertEqual(path[-1].letters, puzzle["grid"].encode())
+            self.assertEqual(len(path) - 1, min_swap_count(start.letters, puzzle["grid"].encode()))
+
+
+def breadth_first_distance(start: bytes, goal: bytes) -> int:
+    distances = {start: 0}
+    frontier = [start]
+    while goal not in distances:
+        next_frontier = []
+        for state in frontier:
+            for i in range(len(state)):
+                for j in range(i + 1, len(state)):
+                    neighbour = swap(state, i, j)
+                    if neighbour not in distances:
+                        distances[neighbour] = distances[state] + 1
+                        next_frontier.append(neighbour)
+        frontier = next_frontier
+    return distances[goal]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import unittest
+from client import SolveClient
+from generate import generate
+from server import SolveServer
+from utils import grid_string_to_words
+
+
+class TestSolveServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        cls.server = SolveServer(port=0, workers=1)
+        asyncio.run_coroutine_threadsafe(cls.server.start(), cls.loop).result(30)
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.close(), cls.loop).result(30)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+
+    def test_solve_and_stats(self):
+        client = SolveClient(port=self.server.port)
+        for puzzle in generate(3, seed=6, workers=1):
+            answer = client.solve(puzzle["shuffled"], puzzle["diff"])
+            self.assertEqual(answer["status"], 200)
+            self.assertEqual(answer["words"], grid_string_to_words(puzzle["grid"]))
+        stats = client.stats()
+        self.assertGreaterEqual(stats["requests"], 3)
+        self.assertGreater(stats["latency"]["p50"], 0)
+        client.close()
+
+    def test_deadline_and_errors(self):
+        client = SolveClient(port=self.server.port)
+        puzzle = next(generate(1, seed=6, workers=1))
+        self.assertEqual(client.solve(puzzle["shuffled"], puzzle["diff"], deadline=0)["status"], 504)
+        self.assertEqual(client.request("POST", "/solve")["status"], 400)
+        self.assertEqual(client.request("GET", "/unknown")["status"], 404)
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,13 @@
+import random
 import unittest
-from waffle_solver import get_line_column
+import numpy as np
+from generate import generate
+from waffle import Waffle
+from lexicon import get_lexicon
+from utils import diff_from_string, grid_string_to_words, words_to_grid, string_diff
+from waffle_solver import WaffleSolver, get_line_column, batch_words_match, candidates_from_mask, get_words_match, \
+    words_constraints, take_letters, budget_from_frequency, OWNED_POSITIONS, cell_masks, letter_bit, \
+    words_requirements
 
 
 class TestWaffleSolver(unittest.TestCase):
@@ -13,3 +21,72 @@ class TestWaffleSolver(unittest.TestCase):
     def test_get_line_column_column_only(self):
         self.assertEqual(get_line_column((1, 2)), [(0, 2), (1, 2), (2, 2), (3, 2), (4, 2)])
 
+    def test_batch_words_match_same_as_get_words_match(self):
+        waffle = Waffle()
+        puzzles = [(waffle.shuffled_grid, waffle.diff), (waffle.true_grid, np.zeros((5, 5), dtype=int))]
+        matches = batch_words_match(puzzles)
+        self.assertEqual(matches.shape, (2, 6, len(get_lexicon())))
+        for (grid, diff), mask in zip(puzzles, matches):
+            masks, requirements = cell_masks(grid, diff)
+            self.assertEqual(candidates_from_mask(mask),
+                             [get_words_match(c, required=r)
+                              for c, r in zip(words_constraints(grid, diff), words_requirements(requirements))])
+
+    def test_batch_words_match_in_chunks_uses_requirements(self):
+        puzzles = [(words_to_grid(grid_string_to_words(puzzle["shuffled"])), diff_from_string(puzzle["diff"]))
+                   for puzzle in generate(5, seed=7, workers=1)]
+        matches = batch_words_match(puzzles, chunk_size=2)
+        self.assertEqual(matches.tolist(), batch_words_match(puzzles).tolist())
+        for (grid, diff), mask in zip(puzzles, matches):
+            solver = WaffleSolver(grid, diff)
+            self.assertEqual(candidates_from_mask(mask), solver.candidates)
+        self.assertEqual(batch_words_match([]).shape, (0, 6, len(get_lexicon())))
+
+    def test_take_letters_is_all_or_nothing(self):
+        budget = budget_from_frequency({'A': 1, 'B': 2})
+        self.assertTrue(take_letters(budget, 'AB'))
+        self.assertFalse(take_letters(budget, 'BA'))
+        self.assertEqual(budget, budget_from_frequency({'B': 1}))
+
+    def test_owned_positions_cover_grid_once(self):
+        self.assertEqual(sum(len(positions) for positions in OWNED_POSITIONS), 21)
+
+    def test_solved_grid_has_a_single_solution(self):
+        waffle = Waffle()
+        solver = WaffleSolver(waffle.true_grid, np.zeros((5, 5), dtype=int))
+        self.assertEqual(list(solver.iter_solutions()), [waffle.chosen_words])
+        self.assertEqual(solver.count_solutions(limit=None), 1)
+
+    def test_load_shuffled_waffle_detects_ambiguity(self):
+        waffle = Waffle()
+        waffle.load_shuffled_waffle('roaalaaoeltbvnuitiein',
+                                    np.array([[0, 2, 1, 0, 0], [2, 0, 2, 0, 2], [1, 2, 0, 1, 2],
+                                              [2, 0, 2, 0, 1], [0, 2, 2, 2, 0]]))
+        solver = WaffleSolver(waffle.shuffled_grid, waffle.diff)
+        self.assertEqual(waffle.ambiguous, solver.count_solutions() > 1)
+        self.assertEqual(waffle.chosen_words, next(solver.iter_solutions()))
+
+    def test_cell_masks_keep_the_solution(self):
+        rng = random.Random(3)
+        puzzles = list(generate(100, seed=3, workers=1, swaps=15))
+        for puzzle in puzzles[:50]:
+            # Fully shuffled grids as well, with many yellow and black letters
+            letters = list(puzzle["grid"])
+            rng.shuffle(letters)
+            shuffled = ''.join(letters)
+            puzzles.append({"grid": puzzle["grid"], "shuffled": shuffled, "diff": string_diff(puzzle["grid"], shuffled)})
+
+        for puzzle in puzzles:
+            goal = puzzle["grid"]
+            masks, requirements = cell_masks(words_to_grid(grid_string_to_words(puzzle["shuffled"])),
+                                             diff_from_string(puzzle["diff"]))
+            for i, letter in enumerate(goal):
+                self.assertTrue(masks[i] & letter_bit(letter))
+            for letter, cells in requirements:
+                self.assertTrue(any(goal[j] == letter for j in cells))
+
+    def test_solver_finds_generated_solution(self):
+        for puzzle in generate(30, seed=4, workers=1, swaps=20):
+            solver = WaffleSolver(words_to_grid(grid_string_to_words(puzzle["shuffled"])),
+                                  diff_from_string(puzzle["diff"]))
+            self.assertIn(grid_string_to_words(puzzle["grid"]), list(solver.iter_solutions()))
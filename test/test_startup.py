@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+PACKAGE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fresh interpreter solving one puzzle, as short-lived CLI and worker invocations do
+FIRST_SOLVE = """
+import sys
+from cache import solve_words, solve_swaps
+words, ambiguous = solve_words("AWREEWAIRABRRSKOHOTOR", "001200221102002002020")
+solve_swaps("AWREEWAIRABRRSKOHOTOR", "001200221102002002020", words)
+print("numpy" in sys.modules)
+"""
+
+# Startup to first solve, in seconds: about 0.1 s without NumPy on a laptop, the bound leaves room for slow CI
+MAX_STARTUP = 2.0
+
+
+class TestStartup(unittest.TestCase):
+    def test_first_solve_does_not_import_numpy(self):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", FIRST_SOLVE], cwd=PACKAGE, capture_output=True, text=True,
+                                check=True)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result.stdout.strip(), "False")
+        self.assertLess(elapsed, MAX_STARTUP)
+
+
+if __name__ == '__main__':
+    unittest.main()
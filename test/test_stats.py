@@ -0,0 +1,34 @@
+import unittest
+from generate import generate
+from stats import SolveStats
+from utils import diff_from_string, grid_string_to_words, words_to_grid
+from waffle_path import SimplifiedWaffle, a_star
+from waffle_solver import WaffleSolver
+
+
+class TestStats(unittest.TestCase):
+    def test_solver_counters(self):
+        reported = []
+        for puzzle in generate(5, seed=6, workers=1):
+            stats = SolveStats(callback=reported.append)
+            solver = WaffleSolver(words_to_grid(grid_string_to_words(puzzle["shuffled"])),
+                                  diff_from_string(puzzle["diff"]), stats=stats)
+            solver.solve()
+            self.assertEqual(stats.max_depth, 6)
+            self.assertGreaterEqual(stats.candidates, 6 + stats.intersection_prunes + stats.frequency_prunes)
+            self.assertEqual(set(stats.phases), {"constraints", "search"})
+            self.assertIs(reported[-1], stats)
+        self.assertEqual(len(reported), 5)
+
+    def test_search_counters(self):
+        puzzle = next(generate(1, seed=6, workers=1))
+        stats = SolveStats()
+        path = a_star(SimplifiedWaffle(puzzle["shuffled"], goal=puzzle["grid"]),
+                      SimplifiedWaffle(puzzle["grid"], goal=puzzle["grid"]), stats=stats)
+        self.assertEqual(stats.expanded, len(path) - 1)
+        self.assertGreater(stats.max_frontier, 0)
+        self.assertIn("search", stats.as_dict()["phases"])
+
+
+if __name__ == '__main__':
+    unittest.main()
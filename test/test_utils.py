@@ -1,5 +1,8 @@
 import unittest
-from utils import words_to_grid_string
+import random
+from generate import generate
+from utils import words_to_grid_string, get_diff, string_diff, batch_string_diff, grid_to_grid_string, \
+    grid_string_to_words, words_to_grid
 
 
 class TestUtilsFunctions(unittest.TestCase):
@@ -7,6 +10,17 @@ class TestUtilsFunctions(unittest.TestCase):
         self.assertEqual(words_to_grid_string(['AATUE', 'ELTBV', 'ROAAL', 'LOVIN', 'TIEIN', 'RAENT']),
                          'roaalaaoeltbvnuitiein'.upper())
 
+    def test_string_diff_same_as_get_diff(self):
+        rng = random.Random(0)
+        for puzzle in generate(30, seed=3, workers=1):
+            goal = puzzle["grid"]
+            states = [''.join(rng.sample(goal, len(goal))) for _ in range(20)] + [puzzle["shuffled"]]
+            expected = [grid_to_grid_string(get_diff(words_to_grid(grid_string_to_words(goal)),
+                                                     words_to_grid(grid_string_to_words(state))))
+                        for state in states]
+            self.assertEqual(batch_string_diff(goal, states), expected)
+            self.assertEqual(string_diff(goal.encode(), states[0].encode()), expected[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,37 @@
+import random
+import unittest
+from waffle import Waffle
+from utils import check_grid, words_to_grid, get_diff, GRID_CELLS
+
+
+class TestWaffle(unittest.TestCase):
+    def test_new_waffle_grid_is_valid(self):
+        random.seed(0)
+        for _ in range(50):
+            waffle = Waffle()
+            self.assertTrue(check_grid(waffle.chosen_words, 5))
+            self.assertEqual(waffle.true_grid, words_to_grid(waffle.chosen_words))
+
+    def test_candidate_words_match_shared_cells(self):
+        waffle = Waffle()
+        waffle.chosen_words = [waffle.chosen_words[0], '', '', '', '', '']
+        for word in waffle.candidate_words(2):
+            self.assertEqual(word[2], waffle.chosen_words[0][0])
+            self.assertNotEqual(word, waffle.chosen_words[0])
+
+    def test_switch_updates_diff_like_get_diff(self):
+        rng = random.Random(0)
+        waffle = Waffle(rng=rng)
+        for _ in range(200):
+            a, b = rng.sample(GRID_CELLS, 2)
+            waffle.switch(a, b)
+            self.assertEqual(waffle.diff, get_diff(waffle.true_grid, waffle.shuffled_grid))
+
+    def test_switch_rejects_holes(self):
+        waffle = Waffle()
+        with self.assertRaises(ValueError):
+            waffle.switch((1, 1), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,46 @@
-from typing import List, Generator
-import numpy as np
-from numpy.typing import ArrayLike
-import copy
+from typing import Any, List, Generator, Tuple, Sequence, Iterable, Dict, Union
+import os
+from functools import lru_cache
 
+# 5x5 grid of letters or of colors, indexed as grid[x][y]: lists of lists, or a 2D NumPy array
+Grid = Sequence[Sequence[Any]]
 
-def load_data() -> List[str]:
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "words.txt")
+
+# Coordinates in the 5x5 grid of the letters of the grid string
+GRID_CELLS: List[Tuple[int, int]] = [(x, y) for x in range(5) for y in range(5) if x % 2 == 0 or y % 2 == 0]
+
+# Indexes in the grid string of the full row (resp. column) through each letter, empty if there is none
+ROWS: List[List[int]] = [[j for j, (a, _) in enumerate(GRID_CELLS) if a == x] if x % 2 == 0 else []
+                         for x, y in GRID_CELLS]
+COLUMNS: List[List[int]] = [[j for j, (_, b) in enumerate(GRID_CELLS) if b == y] if y % 2 == 0 else []
+                            for x, y in GRID_CELLS]
+
+# Cells where get_diff looks for the letter of a misplaced cell, in the order it does:
+# the row and the column for intersections, the only line through the cell otherwise
+REFERENCE_CELLS: List[List[int]] = [sorted(set(ROWS[i]) | set(COLUMNS[i])) for i in range(len(GRID_CELLS))]
+# Whether a yellow letter uses every matching cell of its line (cells on a single line),
+# rather than only the first one (intersections)
+USES_WHOLE_LINE: List[bool] = [not (ROWS[i] and COLUMNS[i]) for i in range(len(GRID_CELLS))]
+
+# Indexes in the grid string of the letters of each word, see grid_string_to_words
+WORDS_CELLS: List[List[int]] = [[2, 6, 10, 14, 18], [8, 9, 10, 11, 12], [0, 1, 2, 3, 4],
+                                [4, 7, 12, 15, 20], [16, 17, 18, 19, 20], [0, 5, 8, 13, 16]]
+
+# The 9 cells shared by two words, as ((word, position), (other word, other position))
+INTERSECTIONS: List[Tuple[Tuple[int, int], Tuple[int, int]]] = [
+    ((a, i), (b, j)) for a in range(6) for b in range(a + 1, 6)
+    for i in range(5) for j in range(5) if WORDS_CELLS[a][i] == WORDS_CELLS[b][j]]
+
+
+def load_data(path: str = LEXICON_PATH) -> List[str]:
     """
     Loads every 5-letters words from words.txt
+    Prefer lexicon.get_lexicon(), which only reads the file once per process.
+    :param path: Path of the words file, words.txt next to this module by default
     :return: List containing 5-letters words
     """
-    with open("words.txt") as f:
+    with open(path) as f:
         return [w.upper() for w in f.read().splitlines()]
 
 
@@ -43,43 +74,43 @@ def check_grid(choices: List[str], index: int) -> bool:
     return output
 
 
-def words_to_grid(words: List[str]) -> ArrayLike:
+def words_to_grid(words: List[str]) -> List[List[str]]:
     """
     Convert list of words to the grid of letters forming the waffle.
     :param words: List of words
     :return: Grid of letters
     """
-    output = np.array([[' '] * 5] * 5)
+    output = [[' '] * 5 for _ in range(5)]
 
     # First word
     for i in range(5):
         if i < len(words[0]):
-            output[i, 2] = words[0][i]
+            output[i][2] = words[0][i]
 
     # Second word
     for i in [0, 1, 3, 4]:
         if i < len(words[1]):
-            output[2, i] = words[1][i]
+            output[2][i] = words[1][i]
 
     # Third word
     for i in [0, 1, 3, 4]:
         if i < len(words[2]):
-            output[0, i] = words[2][i]
+            output[0][i] = words[2][i]
 
     # Fourth word
     for i in [1, 3, 4]:
         if i < len(words[3]):
-            output[i, 4] = words[3][i]
+            output[i][4] = words[3][i]
 
     # Fifth word
     for i in [0, 1, 3]:
         if i < len(words[4]):
-            output[4, i] = words[4][i]
+            output[4][i] = words[4][i]
 
     # Sixth word
     for i in [1, 3]:
         if i < len(words[5]):
-            output[i, 0] = words[5][i]
+            output[i][0] = words[5][i]
 
     return output
 
@@ -90,49 +121,140 @@ def grid_path_generator(n: int) -> Generator[int, None, None]:
             yield i, j
 
 
-def get_diff(true_grid: ArrayLike, shuffled_grid: ArrayLike) -> ArrayLike:
-    diff = np.full((5, 5), 2)
+def get_diff(true_grid: Grid, shuffled_grid: Grid) -> List[List[int]]:
+    diff = [[2] * 5 for _ in range(5)]
 
     # To handle words containing twice or more the same letter, a reference is built
     # and letters are removed from that reference when they are used
-    ref = copy.deepcopy(true_grid)
+    ref = [list(row) for row in true_grid]
 
     # Remove from ref correctly placed letters
     for x, y in grid_path_generator(5):
-        if shuffled_grid[x, y] == true_grid[x, y]:
-            ref[x, y] = ''
-            diff[x, y] = 0
+        if shuffled_grid[x][y] == true_grid[x][y]:
+            ref[x][y] = ''
+            diff[x][y] = 0
 
     for x, y in grid_path_generator(5):
-        letter = shuffled_grid[x, y]
+        letter = shuffled_grid[x][y]
 
-        if letter == ' ' or letter == true_grid[x, y]:
+        if letter == ' ' or letter == true_grid[x][y]:
             continue
 
         if x % 2 == 1 and y % 2 == 0 :
             # Located in lines 1 and 3
-            if letter in ref[:, y]:
-                diff[x, y] = 1
-                idx = np.where(ref[:, y] == letter)
-                ref[idx, y] = ''
+            if any(ref[i][y] == letter for i in range(5)):
+                diff[x][y] = 1
+                for i in range(5):
+                    if ref[i][y] == letter:
+                        ref[i][y] = ''
 
         elif x % 2 == 0 and y % 2 == 1:
             # Located in columns 1 and 3
-            if letter in ref[x, :]:
-                diff[x, y] = 1
-                idx = np.where(ref[:, x] == letter)
-                ref[x, idx] = ''
+            if letter in ref[x]:
+                diff[x][y] = 1
+                for j in range(5):
+                    if ref[x][j] == letter:
+                        ref[x][j] = ''
 
-        elif letter in ref[x, :] or letter in ref[:, y]:
-            diff[x, y] = 1
+        elif letter in ref[x] or any(ref[i][y] == letter for i in range(5)):
+            diff[x][y] = 1
 
-            idx = np.where(ref == letter)
-            idx = [i for i in list(zip(*idx)) if i[0] == x or i[1] == y][0]
-            ref[idx] = ''
+            i, j = next((i, j) for i, j in grid_path_generator(5) if ref[i][j] == letter and (i == x or j == y))
+            ref[i][j] = ''
 
     return diff
 
 
+def letters_colors(goal: Sequence, letters: Sequence, changed: Iterable) -> Dict[int, int]:
+    """
+    Colors of the cells holding one of the changed letters, computed as get_diff does.
+    Cells holding other letters keep their color when only these letters moved: get_diff
+    only matches a letter against the same letter. After a swap, only the cells holding
+    one of the two swapped letters need to be colored again.
+    :param goal: Letters of the solved grid, in grid string order
+    :param letters: Letters of the shuffled grid, in grid string order
+    :param changed: Letters whose cells are colored
+    :return: Colors (0 green, 1 yellow, 2 black) by grid string index
+    """
+    changed = set(changed)
+    needing = needing_cells(goal)
+    available = available_cells(goal, letters)
+    return {i: cell_color(goal, letters, i, needing, available) for i in range(len(letters)) if letters[i] in changed}
+
+
+def string_diff(goal: Union[str, bytes], letters: Union[str, bytes]) -> str:
+    """
+    Same as get_diff, on grid strings.
+    :param goal: Solved grid string
+    :param letters: Shuffled grid string, of the same type as goal
+    :return: Diff string, '0' for green, '1' for yellow and '2' for black
+    """
+    return batch_string_diff(goal, [letters])[0]
+
+
+@lru_cache(maxsize=256)
+def needing_cells(goal: Union[str, bytes]) -> List[Dict]:
+    """
+    needing_cells(goal)[i][letter] lists the cells get_diff looks at when cell i holds
+    letter, and which need this letter.
+    """
+    needing: List[Dict] = [{} for _ in range(len(goal))]
+    for i in range(len(goal)):
+        for j in REFERENCE_CELLS[i]:
+            needing[i].setdefault(goal[j], []).append(j)
+    return needing
+
+
+def available_cells(goal: Sequence, letters: Sequence) -> List[bool]:
+    """
+    Cells of the reference grid of get_diff still holding their letter before coloring: misplaced ones.
+    """
+    return [letters[j] != goal[j] for j in range(len(goal))]
+
+
+def cell_color(goal: Sequence, letters: Sequence, i: int, needing: List[Dict], available: List[bool]) -> int:
+    """
+    Color get_diff gives to cell i, the cells before it in grid string order being colored already.
+    This is the single encoding of its rule: a misplaced letter is yellow when a cell of its line or
+    column (see REFERENCE_CELLS) needs it and was not used yet by an earlier cell. A cell in a single
+    line uses every such cell, a cell at an intersection only the first one.
+    :param needing: See needing_cells
+    :param available: See available_cells, the cells used by cell i being removed from it
+    :return: 0 green, 1 yellow, 2 black
+    """
+    letter = letters[i]
+    if letter == goal[i]:
+        return 0
+
+    color = 2
+    for j in needing[i].get(letter, ()):
+        if available[j]:
+            available[j] = False
+            color = 1
+            if not USES_WHOLE_LINE[i]:
+                break
+    return color
+
+
+def batch_string_diff(goal: Union[str, bytes], states: Iterable[Union[str, bytes]]) -> List[str]:
+    """
+    Same as get_diff, on many grid strings sharing the same solution.
+    Cells needing each letter around each cell are looked up once for all states.
+    :param goal: Solved grid string
+    :param states: Shuffled grid strings, of the same type as goal
+    :return: Diff strings, '0' for green, '1' for yellow and '2' for black
+    """
+    size = len(goal)
+    needing = needing_cells(goal)
+
+    output: List[str] = []
+    for letters in states:
+        available = available_cells(goal, letters)
+        output.append(''.join(['012'[cell_color(goal, letters, i, needing, available)] for i in range(size)]))
+
+    return output
+
+
 def grid_string_to_words(grid: str) -> List[str]:
     """
     Converts a grid string to a list of words
@@ -155,5 +277,40 @@ def words_to_grid_string(words: List[str]) -> str:
                     words[4]])
 
 
+def grid_to_grid_string(grid: Grid) -> str:
+    """
+    Converts a 5x5 grid, of letters or of diff values, to a grid string
+    :param grid: 5x5 grid
+    :return: grid string
+    """
+    return ''.join([str(grid[x][y]) for x, y in GRID_CELLS])
+
+
+def diff_from_string(diff: str) -> List[List[int]]:
+    """
+    Converts a diff string to a 5x5 diff matrix, holes of the grid being green as in get_diff
+    :param diff: diff string
+    :return: diff matrix
+    """
+    output = [[0] * 5 for _ in range(5)]
+    for (x, y), color in zip(GRID_CELLS, diff):
+        output[x][y] = int(color)
+    return output
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a list of values
+    :param values: values, in any order
+    :param q: percentile, between 0 and 100
+    :return: value below which q percents of values lie, 0 if there is none
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[min(int(rank), len(ordered)) - 1]
+
+
 if __name__ == "__main__":
     print(grid_string_to_words('roaalaaoeltbvnuitiein'))
@@ -1,10 +1,16 @@
+import copy
 import random
+from itertools import islice
 from utils import *
 from colors import GREEN, YELLOW, ENDC
-from typing import List
-import numpy as np
-from numpy.typing import ArrayLike
-from waffle_solver import WaffleSolver
+from typing import List, Generator, Optional, Tuple
+from waffle_solver import WaffleSolver, PREVIOUS_ARCS
+from lexicon import Lexicon, get_lexicon, bits_to_indexes
+
+# Words tried by build_waffle_grid before restarting from another first word
+MAX_NODES = 500
+# Restarts before new_waffle_grid gives up
+MAX_ATTEMPTS = 100
 
 
 class Waffle:
@@ -21,63 +27,95 @@ class Waffle:
     4 4 0 4 3
     """
 
-    def __init__(self, words=None, shuffle=None) -> None:
-        self.data: List[str] = load_data()
+    def __init__(self, words=None, shuffle=None, rng: Optional[random.Random] = None,
+                 lexicon: Optional[Lexicon] = None) -> None:
+        """
+        :param rng: Random generator used to build and shuffle grids, the random module by default
+        :param lexicon: Lexicon words are taken from, the shared one by default
+        """
+        self.rng = random if rng is None else rng
+        self.lexicon: Lexicon = get_lexicon() if lexicon is None else lexicon
+        self.data: List[str] = self.lexicon.words
         self.chosen_words: List[str] = ['', '', '', '', '', '']
-        self.true_grid: ArrayLike = np.empty((5, 5), dtype=str)
-        self.shuffled_grid: ArrayLike = np.empty((5, 5), dtype=str)
+        # Words build_waffle_grid may still try before giving up
+        self.nodes_left: int = MAX_NODES
+        self.true_grid: Grid = [[' '] * 5 for _ in range(5)]
+        self.shuffled_grid: Grid = [[' '] * 5 for _ in range(5)]
         # 0 if correctly placed, 1 if in same line/column, 2 else
-        self.diff: ArrayLike = np.empty((5, 5), dtype=int)
+        self.diff: Grid = [[2] * 5 for _ in range(5)]
+        # True when a loaded shuffled grid has more than one solution
+        self.ambiguous: bool = False
 
         if words is None or shuffle is None:
             # Making up a new grid
             self.new_waffle_grid()
 
-    def build_waffle_grid(self, word_index: int) -> bool:
+    def candidate_words(self, word_index: int) -> Generator[str, None, None]:
         """
-        Building a waffle grid recursively with backtracking
+        Words fitting at word_index given the words placed before it, in random order.
+        Only words having the right letters on the shared cells are looked up, using the lexicon index.
+        """
+        bits = self.lexicon.all
+        for position, other, other_position in PREVIOUS_ARCS[word_index]:
+            bits &= self.lexicon.with_letter(position, self.chosen_words[other][other_position])
+
+        indexes = bits_to_indexes(bits)
+        self.rng.shuffle(indexes)
+        for i in indexes:
+            word = self.lexicon.words[i]
+            # A word cannot appear twice in the grid
+            if word not in self.chosen_words:
+                yield word
+
+    def build_waffle_grid(self, word_index: int = 0) -> bool:
+        """
+        Building a waffle grid recursively with backtracking.
+        Gives up once self.nodes_left words have been tried.
         """
         # Ending condition
-        if '' not in self.chosen_words:
+        if word_index > 5:
             return True
 
-        for word in self.data:
-            # See if word fits
-            option = self.chosen_words[:]
-            option[word_index] = word
-            if check_grid(option, word_index):
-                # Word fits, try next word
-                self.chosen_words[word_index] = word
-                if self.build_waffle_grid(word_index + 1):
-                    return True
-                self.chosen_words[word_index] = ''
+        for word in self.candidate_words(word_index):
+            self.nodes_left -= 1
+            if self.nodes_left < 0:
+                break
+            # Word fits, try next word
+            self.chosen_words[word_index] = word
+            if self.build_waffle_grid(word_index + 1):
+                return True
 
         # No word fits, backtrack
+        self.chosen_words[word_index] = ''
         return False
 
     def new_waffle_grid(self) -> None:
         """
         Uses recursive method build_waffle_grid to build a new grid.
+        The search restarts from a new random first word every MAX_NODES tried words.
         Also fills self.true_grid and self.shuffled_grid.
         :return: None
         """
-        random.shuffle(self.data)
-        for i in range(len(self.data)):
+        for _ in range(MAX_ATTEMPTS):
             self.chosen_words = ['', '', '', '', '', '']
-            if self.build_waffle_grid(i):
+            self.nodes_left = MAX_NODES
+            if self.build_waffle_grid(0):
                 self.true_grid = words_to_grid(self.chosen_words)
                 self.shuffle_grid()
                 return
 
-    def load_shuffled_waffle(self, shuffle: str, diff: ArrayLike) -> None:
+        raise ValueError("Could not build a waffle grid from the lexicon")
+
+    def load_shuffled_waffle(self, shuffle: str, diff: Grid) -> None:
         shuffle = grid_string_to_words(shuffle)
         self.shuffled_grid = words_to_grid([w.upper() for w in shuffle])
         self.diff = diff
-        # Solving the waffle
-        solver = WaffleSolver(self.shuffled_grid, self.diff)
-        solver.solve()
+        # Solving the waffle, looking for a second solution only to detect ambiguity
+        solver = WaffleSolver(self.shuffled_grid, self.diff, lexicon=self.lexicon)
+        solutions = list(islice(solver.iter_solutions(), 2))
+        self.ambiguous = len(solutions) > 1
         # Load the solved waffle!
-        self.chosen_words = [w.upper() for w in solver.solution]
+        self.chosen_words = [w.upper() for w in solutions[0]] if solutions else ['', '', '', '', '', '']
         self.true_grid = words_to_grid(self.chosen_words)
 
     def load_waffle(self, words: List[str]) -> None:
@@ -99,8 +137,8 @@ class Waffle:
 
         for _ in range(nb):
             # Randomly swap letters two by two, leaving corners and center letters untouched
-            a, b = random.choices(possible_switch_indexes, k=2)
-            self.shuffled_grid[a], self.shuffled_grid[b] = self.shuffled_grid[b], self.shuffled_grid[a]
+            (xa, ya), (xb, yb) = self.rng.choices(possible_switch_indexes, k=2)
+            self.shuffled_grid[xa][ya], self.shuffled_grid[xb][yb] = self.shuffled_grid[xb][yb], self.shuffled_grid[xa][ya]
 
         self.diff = get_diff(self.true_grid, self.shuffled_grid)
 
@@ -108,19 +146,40 @@ class Waffle:
             print("Initial grid: ", self.true_grid)
             print("Shuffled grid: ", self.shuffled_grid)
 
+    def switch(self, a: Tuple[int, int], b: Tuple[int, int]) -> None:
+        """
+        Swaps two letters of the shuffled grid, and updates the diff.
+        Only the cells holding one of the two letters are colored again.
+        :param a: Position of the first letter
+        :param b: Position of the second letter
+        :return: None
+        """
+        a, b = tuple(a), tuple(b)
+        if a not in GRID_CELLS or b not in GRID_CELLS:
+            raise ValueError("Cannot switch {} and {}: not letters of the grid".format(a, b))
+
+        (xa, ya), (xb, yb) = a, b
+        changed = (self.shuffled_grid[xa][ya], self.shuffled_grid[xb][yb])
+        self.shuffled_grid[xa][ya], self.shuffled_grid[xb][yb] = changed[1], changed[0]
+
+        colors = letters_colors(grid_to_grid_string(self.true_grid), grid_to_grid_string(self.shuffled_grid), changed)
+        for i, color in colors.items():
+            x, y = GRID_CELLS[i]
+            self.diff[x][y] = color
+
     def __str__(self):
-        output = copy.deepcopy(self.shuffled_grid).tolist()
+        output = [list(row) for row in self.shuffled_grid]
 
         # To handle words containing twice or more the same letter, a reference is built
         # and letters are removed from that reference when they are used
         ref = copy.deepcopy(self.true_grid)
 
         for x, y in grid_path_generator(5):
-            letter = self.shuffled_grid[x, y]
+            letter = self.shuffled_grid[x][y]
 
-            if self.diff[x, y] == 0:
+            if self.diff[x][y] == 0:
                 output[x][y] = GREEN + letter + ENDC
-            elif self.diff[x, y] == 1:
+            elif self.diff[x][y] == 1:
                 output[x][y] = YELLOW + letter + ENDC
             else:
                 output[x][y] = letter
@@ -131,7 +190,7 @@ class Waffle:
 if __name__ == '__main__':
     waffle = Waffle()
     waffle.load_shuffled_waffle('roaalaaoeltbvnuitiein',
-                                np.array([[0, 2, 1, 0, 0], [2, 0, 2, 0, 2], [1, 2, 0, 1, 2],
-                                          [2, 0, 2, 0, 1], [0, 2, 2, 2, 0]]))
+                                [[0, 2, 1, 0, 0], [2, 0, 2, 0, 2], [1, 2, 0, 1, 2],
+                                 [2, 0, 2, 0, 1], [0, 2, 2, 2, 0]])
 
     print(waffle)
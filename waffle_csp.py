@@ -0,0 +1,155 @@
+"""
+Constraint propagation engine for the waffle puzzle.
+
+The six words are the variables of a CSP, their domains being the words of the
+lexicon matching the constraints derived from the colors (see cell_masks). Words are linked by the 9 cells they share:
+a letter can only stay at a shared cell if both words still have a candidate
+with that letter there (arc consistency). The search always branches on the word
+with the fewest candidates left (MRV), and tracks the letters left to place,
+taken from the shuffled grid.
+
+Domains are bitsets over the lexicon (see lexicon.Lexicon).
+"""
+from typing import List, Dict, Set, Optional, Generator, Tuple
+from itertools import islice
+from lexicon import Lexicon, get_lexicon, bits_to_indexes
+from utils import WORDS_CELLS, INTERSECTIONS, Grid
+from waffle_solver import cell_masks, masks_to_constraints, words_requirements, match_bits, get_frequency, \
+    budget_from_frequency, take_letters, give_letters
+
+# ARCS[word] lists (position, other word, other position) for every cell shared by word
+ARCS: List[List[tuple]] = [[] for _ in range(6)]
+for (_a, _i), (_b, _j) in INTERSECTIONS:
+    ARCS[_a].append((_i, _b, _j))
+    ARCS[_b].append((_j, _a, _i))
+
+
+class CSPSolver:
+
+    def __init__(self, shuffled_grid: Grid, diff_matrix: Grid, lexicon: Optional[Lexicon] = None):
+        """
+        :param shuffled_grid: Grid of letters, as shown by the game
+        :param diff_matrix: Colors of the grid (0 green, 1 yellow, 2 black)
+        :param lexicon: Lexicon to look words up in, the shared one by default
+        """
+        self.shuffled_grid = shuffled_grid
+        self.diff_matrix = diff_matrix
+        self.lexicon: Lexicon = get_lexicon() if lexicon is None else lexicon
+        masks, requirements = cell_masks(self.shuffled_grid, self.diff_matrix)
+        self.location_constraints: List[List[Set[str]]] = masks_to_constraints(masks)
+        self.requirements: List[List[Tuple[str, List[int]]]] = words_requirements(requirements)
+        self.freq_constraints: Dict[str, int] = get_frequency(self.shuffled_grid)
+        self.solution: List[str] = []
+        # Number of words tried during the last solve
+        self.nodes: int = 0
+
+    def solve(self) -> None:
+        """
+        Looks for a solution to the waffle puzzle, stored in self.solution.
+        Slots are left empty when the puzzle has no solution.
+        """
+        self.solution = next(self.iter_solutions(), ['' for _ in range(6)])
+
+    def iter_solutions(self) -> Generator[List[str], None, None]:
+        """
+        Lazily enumerates every list of words solving the waffle puzzle.
+        """
+        self.nodes = 0
+        self.solution = ['' for _ in range(6)]
+
+        domains = [match_bits(self.lexicon, constraint, required)
+                   for constraint, required in zip(self.location_constraints, self.requirements)]
+        if propagate(self.lexicon, domains, range(6)):
+            yield from self.rec_find_solution(domains, budget_from_frequency(self.freq_constraints), [''] * 21)
+
+    def count_solutions(self, limit: Optional[int] = 2) -> int:
+        """
+        Counts the solutions of the waffle puzzle, stopping as soon as limit is reached.
+        :param limit: Maximum number of solutions to enumerate, None to count them all
+        """
+        return sum(1 for _ in islice(self.iter_solutions(), limit))
+
+    def rec_find_solution(self, domains: List[int], budget: List[int],
+                          cells: List[str]) -> Generator[List[str], None, None]:
+        """
+        Assigns the word with the smallest domain, then recurses on the others.
+        :param domains: Bitsets of the candidates of each word
+        :param budget: Number of each letter still to be placed
+        :param cells: Letters already placed in the grid string
+        :return: Solutions extending the words in self.solution
+        """
+        free = [w for w in range(6) if not self.solution[w]]
+        if not free:
+            yield self.solution[:]
+            return
+
+        word_index = min(free, key=lambda w: bin(domains[w]).count('1'))
+
+        for i in bits_to_indexes(domains[word_index]):
+            word = self.lexicon.words[i]
+            if word in self.solution:
+                continue
+            self.nodes += 1
+
+            # Letters this word adds to the grid, shared cells being possibly filled already
+            added = [(cell, letter) for cell, letter in zip(WORDS_CELLS[word_index], word) if not cells[cell]]
+            letters = ''.join([letter for _, letter in added])
+            if not take_letters(budget, letters):
+                continue
+
+            option = domains[:]
+            option[word_index] = 1 << i
+            for position, other, other_position in ARCS[word_index]:
+                option[other] &= self.lexicon.with_letter(other_position, word[position])
+
+            if propagate(self.lexicon, option, [other for _, other, _ in ARCS[word_index]]):
+                for cell, letter in added:
+                    cells[cell] = letter
+                self.solution[word_index] = word
+                yield from self.rec_find_solution(option, budget, cells)
+                self.solution[word_index] = ''
+                for cell, _ in added:
+                    cells[cell] = ''
+
+            give_letters(budget, letters)
+
+
+def revise(lexicon: Lexicon, domains: List[int], word: int, position: int, other: int, other_position: int) -> bool:
+    """
+    Removes from the domain of word the candidates whose letter at position
+    matches no candidate of other at other_position.
+    :return: True if the domain of word shrank
+    """
+    supported = {letter for letter, bits in lexicon.position_index[other_position].items() if bits & domains[other]}
+    revised = domains[word] & lexicon.with_letters(position, supported)
+    if revised == domains[word]:
+        return False
+    domains[word] = revised
+    return True
+
+
+def propagate(lexicon: Lexicon, domains: List[int], changed) -> bool:
+    """
+    Enforces arc consistency on the shared cells (AC-3), starting from the words in changed.
+    Domains are updated in place.
+    :return: False if a domain became empty
+    """
+    queue = list(dict.fromkeys(changed))
+    while queue:
+        other = queue.pop()
+        for other_position, word, position in ARCS[other]:
+            if revise(lexicon, domains, word, position, other, other_position):
+                if not domains[word]:
+                    return False
+                if word not in queue:
+                    queue.append(word)
+    return all(domains)
+
+
+if __name__ == "__main__":
+    from waffle import Waffle
+    waffle = Waffle()
+    solver = CSPSolver(waffle.shuffled_grid, waffle.diff)
+    solver.solve()
+    print(waffle.chosen_words)
+    print(solver.solution, solver.nodes)
@@ -15,170 +15,622 @@ Grid will be represented as strings representing the state of the grid:
     Q R S T U
 
 """
-from typing import Dict, Set, List, Generator, Optional, Tuple
+from typing import Callable, Dict, List, Generator, Optional, Union, Tuple
+from collections import OrderedDict
+import heapq
+import time
 from colors import GREEN, YELLOW, ENDC
-from utils import get_diff
-from numpy.typing import ArrayLike
-import numpy as np
-from statistics import mean
+from utils import string_diff, letters_colors, Grid, GRID_CELLS
+from stats import SolveStats, timed
 
 
 # Conversion functions below
-def grid_from_grid_string(grid: str) -> ArrayLike:
-    return np.array([list(grid[:5]),
-                     [grid[5], ' ', grid[6], ' ', grid[7]],
-                     list(grid[8:13]),
-                     [grid[13], ' ', grid[14], ' ', grid[15]],
-                     list(grid[16:])])
+def grid_from_grid_string(grid: str) -> List[List[str]]:
+    return [list(grid[:5]),
+            [grid[5], ' ', grid[6], ' ', grid[7]],
+            list(grid[8:13]),
+            [grid[13], ' ', grid[14], ' ', grid[15]],
+            list(grid[16:])]
 
 
-def grid_string_from_grid(diff: ArrayLike) -> str:
-    diff[1, 1] = -1
-    diff[1, 3] = -1
-    diff[3, 1] = -1
-    diff[3, 3] = -1
+def grid_string_from_grid(diff: Grid) -> str:
+    return ''.join([str(diff[x][y]) for x, y in GRID_CELLS])
 
-    return ''.join([''.join([str(a) for a in row if a != -1]) for row in diff])
 
-
-def get_string_diff(letters: str) -> str:
+def get_string_diff(letters: Union[str, bytes], goal: Union[str, bytes]) -> str:
     """
     Wrapper for get_diff, using string representations of grids.
     """
-    true_grid: ArrayLike = grid_from_grid_string(SimplifiedWaffle.goal)
-    shuffled_grid: ArrayLike = grid_from_grid_string(letters)
+    if isinstance(letters, str) != isinstance(goal, str):
+        letters, goal = to_state(letters), to_state(goal)
+    return string_diff(goal, letters)
+
 
-    # print(letters)
-    # print(true_grid)
-    # print(shuffled_grid)
+def to_state(grid: Union[str, bytes]) -> bytes:
+    """
+    Converts a grid string to the 21 bytes used as search state.
+    """
+    return grid.upper().encode('ascii') if isinstance(grid, str) else bytes(grid)
 
-    diff: ArrayLike = get_diff(true_grid, shuffled_grid)
 
-    return grid_string_from_grid(diff)
+def to_text(grid: Union[str, bytes]) -> str:
+    return grid.decode('ascii') if isinstance(grid, (bytes, bytearray)) else grid
 
 
 class SimplifiedWaffle:
     """
     A simplified version of the waffle,
     with only the letters and their "color".
+    Both are 21 bytes long: ASCII letters, and b'0', b'1' or b'2' for colors.
     """
 
-    goal = ""
+    __slots__ = ('letters', 'diff')
 
-    def __init__(self, letters: str, diff: str = "0" * 21, goal: Optional[str] = None):
+    def __init__(self, letters: Union[str, bytes], diff: Optional[Union[str, bytes]] = None,
+                 goal: Optional[Union[str, bytes]] = None):
         """
         :param letters: Letters of the waffle.
-        :param diff: Diff of the waffle.
-        :param goal: Goal of the waffle.
+        :param diff: Diff of the waffle, computed from goal if missing.
+        :param goal: Letters of the solved waffle.
         """
-        self.letters = letters.upper()
-        if SimplifiedWaffle.goal == "":
-            SimplifiedWaffle.goal = goal.upper()
-            self.diff = diff
-        else:
-            # Determine diff from letters & goal
-            self.diff = get_string_diff(self.letters)
+        self.letters: bytes = to_state(letters)
+        if diff is None:
+            diff = get_string_diff(self.letters, to_state(goal))
+        self.diff: bytes = to_state(diff)
+
+    def swapped(self, i: int, j: int, goal: bytes) -> "SimplifiedWaffle":
+        """
+        Waffle obtained by swapping the letters at indexes i < j.
+        Only the cells holding one of the two letters are colored again.
+        :param goal: Letters of the solved waffle
+        """
+        letters = swap(self.letters, i, j)
+        diff = bytearray(self.diff)
+        for k, color in letters_colors(goal, letters, (self.letters[i], self.letters[j])).items():
+            diff[k] = ord('0') + color
+        return SimplifiedWaffle(letters, bytes(diff))
+
+    def __eq__(self, other):
+        return isinstance(other, SimplifiedWaffle) and self.letters == other.letters and self.diff == other.diff
 
     def __hash__(self):
         """
         :return: Hash of the waffle.
         """
-        return hash(self.letters + self.diff + self.goal)
+        return hash((self.letters, self.diff))
 
     def __str__(self):
 
         output = ""
 
-        for i, letter in enumerate(self.letters):
-            if self.diff[i] == "2":
+        for letter, color in zip(to_text(self.letters), to_text(self.diff)):
+            if color == "2":
                 output += letter
-            elif self.diff[i] == "1":
+            elif color == "1":
                 output += YELLOW + letter + ENDC
             else:
                 output += GREEN + letter + ENDC
 
-        output += " (" + GREEN + str(self.diff.count("0")) + ENDC + ", " + \
-            YELLOW + str(self.diff.count("1")) + ENDC + ", " + str(self.diff.count("2")) + ")"
+        output += " (" + GREEN + str(self.diff.count(b"0")) + ENDC + ", " + \
+            YELLOW + str(self.diff.count(b"1")) + ENDC + ", " + str(self.diff.count(b"2")) + ")"
 
         return output
 
 
-def reconstruct_path(came_from: Dict[int, int], current: int,
-                     links: Dict[int, SimplifiedWaffle]) -> List[SimplifiedWaffle]:
+# Search node: a waffle, and the node it was reached from
+Node = Tuple[SimplifiedWaffle, Optional[tuple]]
+
+
+def reconstruct_path(node: Node) -> List[SimplifiedWaffle]:
     """
-    Reconstruct the path from the came_from dictionary.
+    Reconstruct the path leading to a search node, following its parents.
     """
-    total_path = [current]
-    while current in came_from:
-        current = came_from[current]
-        total_path.append(current)
-    return [links[w] for w in total_path if w is not None][::-1]
+    total_path = []
+    while node is not None:
+        waffle, node = node
+        total_path.append(waffle)
+    return total_path[::-1]
 
 
-def heuristic(waffle: SimplifiedWaffle) -> int:
+class TranspositionTable:
+    """
+    Best known cost of the states met during a search, holding at most max_size states.
+    When full, the least recently used state is evicted: it may then be expanded again,
+    which costs time but never correctness, as paths are stored in the search nodes.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        """
+        :param max_size: Maximum number of states, unbounded if None
+        """
+        self.max_size = max_size
+        self.costs: "OrderedDict[bytes, int]" = OrderedDict()
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self.costs)
+
+    def get(self, state: bytes) -> Optional[int]:
+        cost = self.costs.get(state)
+        if cost is not None:
+            self.costs.move_to_end(state)
+        return cost
+
+    def put(self, state: bytes, cost: int) -> None:
+        self.costs[state] = cost
+        self.costs.move_to_end(state)
+        if self.max_size is not None and len(self.costs) > self.max_size:
+            self.costs.popitem(last=False)
+            self.evictions += 1
+
+
+def heuristic(waffle: SimplifiedWaffle, goal: Optional[bytes] = None) -> int:
     """
     Calculate the heuristic between two simplified waffles.
     Method: Number of left letters / 2
     This assumes that every move is perfect => Always underestimates real cost.
     """
-    return int((len(waffle.letters) - waffle.diff.count('0')) / 2)
+    return (len(waffle.letters) - waffle.diff.count(b'0')) // 2
+
+
+def cycle_heuristic(waffle: SimplifiedWaffle, goal: bytes) -> int:
+    """
+    Lower bound of the number of swaps, based on cycles (see min_swaps below).
+    Misplaced letters are decomposed into the largest number of cycles, taking the best
+    choice among repeated letters: 2-cycles count for one swap, longer cycles for one
+    swap less than their length. The bound is exact, and at least (non-green cells) / 2.
+    """
+    counts: Dict[Tuple[int, int], int] = {}
+    for have, need in zip(waffle.letters, goal):
+        if have != need:
+            counts[need, have] = counts.get((need, have), 0) + 1
+
+    return sum(counts.values()) - len(max_cycles(counts))
 
 
-def is_perfect_move(previous: SimplifiedWaffle, waffle: SimplifiedWaffle) -> bool:
+def swap(state: bytes, i: int, j: int) -> bytes:
     """
-    Check if the move is perfect.
+    Swaps the letters at indexes i < j of a state.
     """
-    return waffle.diff.count('0') == 2 + previous.diff.count('0')
+    return state[:i] + state[j:j + 1] + state[i + 1:j] + state[i:i + 1] + state[j + 1:]
 
 
-def neighbours(waffle: SimplifiedWaffle) -> Generator[SimplifiedWaffle, None, None]:
+def neighbours(waffle: SimplifiedWaffle, goal: bytes) -> Generator[SimplifiedWaffle, None, None]:
     """
-    Return all the neighbours of a waffle (meaning only switching 2 letters).
+    Return the neighbours of a waffle (meaning only switching 2 letters) worth exploring:
+    those where at least one of the two letters lands on a cell needing it.
+    Swaps fixing both cells come first.
+
+    No shortest path is lost: in any state, the misplaced cells form cycles where the letter
+    of each cell is needed by the next one. Swapping a cell with the next one in its cycle
+    fixes that next cell and leaves a cycle one cell shorter, which is one swap closer to
+    the goal (see min_swaps below). Such a swap is always proposed here.
+    :param goal: Letters of the solved waffle
     """
-    switchable: List[Tuple[int, str]] = [(i, letter) for i, letter in enumerate(waffle.letters) if waffle.diff[i] != '0']
+    letters = waffle.letters
+    misplaced: List[int] = [i for i in range(len(letters)) if letters[i] != goal[i]]
+    fixing_one: List[Tuple[int, int]] = []
+
+    for idi, i in enumerate(misplaced):
+        for j in misplaced[idi + 1:]:
+            if letters[i] == letters[j]:
+                continue
+            fixes_i, fixes_j = letters[j] == goal[i], letters[i] == goal[j]
+            if fixes_i and fixes_j:
+                yield waffle.swapped(i, j, goal)
+            elif fixes_i or fixes_j:
+                fixing_one.append((i, j))
+
+    for i, j in fixing_one:
+        yield waffle.swapped(i, j, goal)
+
+
+def a_star(start: SimplifiedWaffle, goal: SimplifiedWaffle, max_states: Optional[int] = None,
+           estimate: Callable[[SimplifiedWaffle, bytes], int] = cycle_heuristic,
+           stats: Optional[SolveStats] = None) -> List[SimplifiedWaffle]:
+    """
+    Looks for the shortest sequence of swaps from start to goal.
+    States are identified by their letters, the goal being fixed during a search.
+    The open set is a binary heap: outdated entries are skipped when popped (lazy deletion).
+    :param max_states: Maximum number of states remembered in the transposition table, and of entries
+    in the open set, unbounded if None. Once the open set outgrows it, the search gives up and the path
+    is built by cycle_path, as short but found without a search
+    :param estimate: Admissible heuristic, called with a waffle and the goal letters
+    :param stats: If given, filled with expanded states, largest open set and search time
+    :return: Waffles from start to goal, empty if goal cannot be reached
+    """
+    with timed(stats, "search"):
+        path = a_star_search(start, goal, max_states, estimate, stats)
+    if stats is not None:
+        stats.report()
+    return path
+
+
+def a_star_search(start: SimplifiedWaffle, goal: SimplifiedWaffle, max_states: Optional[int],
+                  estimate: Callable[[SimplifiedWaffle, bytes], int],
+                  stats: Optional[SolveStats]) -> List[SimplifiedWaffle]:
+    table = TranspositionTable(max_states)
+    table.put(start.letters, 0)
+    h = estimate(start, goal.letters)
+    # Entries are (f score, heuristic, insertion order, cost so far, node)
+    open_heap: List[Tuple[int, int, int, int, Node]] = [(h, h, 0, 0, (start, None))]
+    pushed = 1
+    expanded = 0
+
+    while open_heap:
+        _, _, _, cost, node = heapq.heappop(open_heap)
+        current = node[0]
+
+        best = table.get(current.letters)
+        if best is not None and best < cost:
+            # A cheaper path to this state was found after this entry was pushed
+            continue
+
+        if current.letters == goal.letters:
+            if stats is not None:
+                stats.expanded += expanded
+            return reconstruct_path(node)
+
+        expanded += 1
+        if stats is not None:
+            stats.max_frontier = max(stats.max_frontier, len(open_heap))
+
+        tentative_g_score = cost + 1
+        for neighbour in neighbours(current, goal.letters):
+            best = table.get(neighbour.letters)
+            if best is None or tentative_g_score < best:
+                table.put(neighbour.letters, tentative_g_score)
+                h = estimate(neighbour, goal.letters)
+                heapq.heappush(open_heap, (tentative_g_score + h, h, pushed, tentative_g_score, (neighbour, node)))
+                pushed += 1
+
+        if max_states is not None and len(open_heap) > max_states:
+            # Entries hold their whole path: the open set, not the table, is what fills the memory
+            if stats is not None:
+                stats.expanded += expanded
+            return cycle_path(start, goal)
+
+    if stats is not None:
+        stats.expanded += expanded
+    return []
 
-    for idi, (i, letter_i) in enumerate(switchable):
-        for idj, (j, letter_j) in enumerate(switchable[idi + 1:]):
-            if waffle.letters[i] != waffle.letters[j]:
-                yield SimplifiedWaffle(waffle.letters[:i] + waffle.letters[j] + waffle.letters[i+1:j] +
-                                       waffle.letters[i] + waffle.letters[j+1:],
-                                       waffle.diff[:i] + waffle.diff[j] + waffle.diff[i+1:j] +
-                                       waffle.diff[i] + waffle.diff[j+1:], waffle.goal)
 
+def bidirectional_search(start: SimplifiedWaffle, goal: SimplifiedWaffle, max_visited: Optional[int] = None,
+                         stats: Optional[SolveStats] = None) -> List[SimplifiedWaffle]:
+    """
+    Looks for the shortest sequence of swaps from start to goal, with breadth-first searches
+    from both ends meeting in the middle. Swaps are reversible: the backward search explores
+    swaps from goal toward start, its states keeping their diff relative to start.
+    The smaller frontier is expanded one whole layer at a time, and the shortest path going
+    through a state met during that layer is returned.
+
+    Both searches only explore the neighbours fixing a cell toward their own target. No
+    shortest path is lost: along the swaps of min_swaps, each swap fixes a cell toward the goal,
+    and the other cell was never swapped before, so it holds its start letter (undoing the swap
+    fixes it toward start).
+    :param max_visited: Maximum number of states visited by both searches together, unbounded if None.
+    Once exceeded, the search gives up and, as a_star does, the path is built by cycle_path
+    :param stats: If given, filled with expanded states and largest layer
+    :return: Waffles from start to goal, empty if goal cannot be reached
+    """
+    expanded = 0
+    # Letters -> node, for each direction. Backward nodes lead to goal.
+    forward: Dict[bytes, Node] = {start.letters: (start, None)}
+    backward: Dict[bytes, Node] = {goal.letters: (SimplifiedWaffle(goal.letters, goal=start.letters), None)}
+    forward_layer, backward_layer = [start.letters], [goal.letters]
+    meeting = start.letters if start.letters == goal.letters else None
+
+    while meeting is None and forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            visited, others, layer, target = forward, backward, forward_layer, goal.letters
+        else:
+            visited, others, layer, target = backward, forward, backward_layer, start.letters
+
+        if stats is not None:
+            stats.max_frontier = max(stats.max_frontier, len(layer))
+        next_layer = []
+        # Meeting states found in this layer, with the length of the path through them
+        meetings: List[Tuple[int, bytes]] = []
+        for letters in layer:
+            node = visited[letters]
+            expanded += 1
+            for neighbour in neighbours(node[0], target):
+                if neighbour.letters in visited:
+                    continue
+                visited[neighbour.letters] = (neighbour, node)
+                next_layer.append(neighbour.letters)
+                if neighbour.letters in others:
+                    meetings.append((path_length(others[neighbour.letters]), neighbour.letters))
+
+        if meetings:
+            meeting = min(meetings)[1]
+        elif max_visited is not None and len(forward) + len(backward) > max_visited:
+            if stats is not None:
+                stats.expanded += expanded
+                stats.report()
+            return cycle_path(start, goal)
+
+        if visited is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
 
-def a_star(start: SimplifiedWaffle, goal: SimplifiedWaffle) -> List[SimplifiedWaffle]:
-    links: Dict[int, SimplifiedWaffle] = {hash(start): start}
-    open_set: Set[int] = {hash(start)}
-    came_from: Dict[int, Optional[int]] = {hash(start): None}
-    cost_so_far: Dict[int, int] = {hash(start): 0}
-    f_score: Dict[int, int] = {hash(start): heuristic(start)}
+    if stats is not None:
+        stats.expanded += expanded
+        stats.report()
+    if meeting is None:
+        return []
 
-    while open_set:
-        current = min(open_set, key=lambda x: f_score[x])
-        open_set.remove(current)
+    path = reconstruct_path(forward[meeting])
+    node = backward[meeting][1]
+    while node is not None:
+        path.append(SimplifiedWaffle(node[0].letters, goal=goal.letters))
+        node = node[1]
+    return path
 
-        if current == hash(goal):
-            return reconstruct_path(came_from, current, links)
 
-        for neighbour in neighbours(links[current]):
-            tentative_g_score = cost_so_far[current] + 1
-            if hash(neighbour) not in cost_so_far or tentative_g_score < cost_so_far[hash(neighbour)]:
-                came_from[hash(neighbour)] = current
-                cost_so_far[hash(neighbour)] = tentative_g_score
-                f_score[hash(neighbour)] = tentative_g_score + heuristic(neighbour)
-                open_set.add(hash(neighbour))
-                links[hash(neighbour)] = neighbour
+def path_length(node: Node) -> int:
+    """
+    Number of swaps from the root of the search to node.
+    """
+    length = 0
+    while node[1] is not None:
+        node = node[1]
+        length += 1
+    return length
 
-                if is_perfect_move(links[current], neighbour):
-                    open_set = {hash(neighbour)}
-                    break
 
-    return []
+class SearchResult:
+    """
+    Outcome of a search with a limited budget.
+    """
+
+    def __init__(self, path: List[SimplifiedWaffle], lower_bound: int, expanded: int):
+        """
+        :param path: Best path found, from start to goal
+        :param lower_bound: Proven minimum number of swaps
+        :param expanded: Number of expanded states
+        """
+        self.path = path
+        self.lower_bound = lower_bound
+        self.expanded = expanded
+
+    @property
+    def moves(self) -> int:
+        return len(self.path) - 1
+
+    @property
+    def gap(self) -> int:
+        """
+        Number of swaps the path may have in excess.
+        """
+        return self.moves - self.lower_bound
+
+    @property
+    def optimal(self) -> bool:
+        return self.gap <= 0
+
+
+def anytime_search(start: SimplifiedWaffle, goal: SimplifiedWaffle, deadline: Optional[float] = None,
+                   max_expansions: Optional[int] = None, weights: Tuple[float, ...] = (3.0, 2.0, 1.5, 1.0),
+                   estimate: Callable[[SimplifiedWaffle, bytes], int] = cycle_heuristic) -> SearchResult:
+    """
+    Looks for the shortest sequence of swaps from start to goal within a time or expansion budget.
+    The path of cycle_path is found first, and is already the shortest: it holds within the
+    game's 15 moves whatever the budget. Weighted A* runs with decreasing weights then look for
+    shorter ones, pruning states that cannot beat the best path. The last run, with weight 1,
+    proves the best path optimal if it completes, which is immediate when the heuristic is exact.
+    Otherwise, the lower bound is given by the heuristic and by the smallest f score left to explore.
+    :param deadline: Time allowed to the search, in seconds, unbounded if None
+    :param max_expansions: Maximum number of expanded states, unbounded if None
+    :param weights: Weights of the heuristic in successive runs, the last one should be 1
+    :param estimate: Admissible heuristic, called with a waffle and the goal letters
+    :return: Best path found, with its optimality gap
+    """
+    end = None if deadline is None else time.perf_counter() + deadline
+    best = cycle_path(start, goal)
+    lower_bound = estimate(start, goal.letters)
+    expanded = 0
+
+    for weight in weights:
+        if len(best) - 1 <= lower_bound:
+            break
+
+        table: Dict[bytes, int] = {start.letters: 0}
+        h = estimate(start, goal.letters)
+        open_heap: List[Tuple[float, int, int, int, Node]] = [(weight * h, h, 0, 0, (start, None))]
+        pushed = 1
+        completed = True
+
+        while open_heap:
+            if (end is not None and time.perf_counter() > end) or \
+                    (max_expansions is not None and expanded >= max_expansions):
+                completed = False
+                break
+
+            f, h, _, cost, node = heapq.heappop(open_heap)
+            current = node[0]
+            if table.get(current.letters, cost) < cost or cost + h >= len(best) - 1:
+                # Outdated entry, or no better than the best path
+                continue
+
+            if weight == 1:
+                # Smallest f score left: no path is shorter
+                lower_bound = max(lower_bound, cost + h)
+
+            if current.letters == goal.letters:
+                best = reconstruct_path(node)
+                continue
+
+            expanded += 1
+            for neighbour in neighbours(current, goal.letters):
+                if cost + 1 < table.get(neighbour.letters, cost + 2):
+                    table[neighbour.letters] = cost + 1
+                    h = estimate(neighbour, goal.letters)
+                    heapq.heappush(open_heap, (cost + 1 + weight * h, h, pushed, cost + 1, (neighbour, node)))
+                    pushed += 1
+
+        if not completed:
+            break
+        if weight == 1:
+            # Every path shorter than the best one was explored
+            lower_bound = len(best) - 1
+
+    return SearchResult(best, min(lower_bound, len(best) - 1), expanded)
+
+
+# Swaps solver based on cycle decomposition
+#
+# A sequence of swaps turning start into goal moves every letter along a permutation
+# of the misplaced cells. A permutation with c cycles over n cells needs n - c swaps,
+# and no sequence does better, so the minimum number of swaps is n minus the maximum
+# number of cycles of such a permutation. When letters are repeated, several
+# permutations exist: cell i, holding letter start[i] and needing goal[i], is seen as
+# an edge goal[i] -> start[i] between letters, and any permutation is a decomposition
+# of this multigraph into cycles. Maximizing the number of cycles is done by:
+# - taking every 2-cycle (a -> b, b -> a) first: if its two edges were in different
+#   cycles of an optimal decomposition, the rest of these two cycles still forms at
+#   least one cycle, so some optimal decomposition contains it;
+# - exhaustively searching, with memoization, the cycles through the remaining edges.
+
+def letter_edges(letters: bytes, goal: bytes) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Misplaced cells, grouped by (needed letter, current letter).
+    """
+    if sorted(letters) != sorted(goal):
+        raise ValueError("Start and goal grids do not hold the same letters")
+
+    edges: Dict[Tuple[int, int], List[int]] = {}
+    for i, (have, need) in enumerate(zip(letters, goal)):
+        if have != need:
+            edges.setdefault((need, have), []).append(i)
+    return edges
+
+
+def max_cycles(counts: Dict[Tuple[int, int], int]) -> List[List[int]]:
+    """
+    Decomposes a multigraph of letters into as many cycles as possible.
+    :param counts: Number of edges between each pair of letters
+    :return: Cycles, as lists of letters [a, b, c] standing for a -> b -> c -> a
+    """
+    counts = {edge: count for edge, count in counts.items() if count > 0}
+    cycles: List[List[int]] = []
+
+    for (a, b) in list(counts):
+        if a < b and (b, a) in counts:
+            pairs = min(counts[a, b], counts[b, a])
+            cycles += [[a, b]] * pairs
+            counts[a, b] -= pairs
+            counts[b, a] -= pairs
+
+    memo: Dict[tuple, Tuple[List[int], ...]] = {}
+    return cycles + list(search_cycles(tuple(sorted((e, c) for e, c in counts.items() if c > 0)), memo))
+
+
+def search_cycles(edges: tuple, memo: Dict[tuple, tuple]) -> tuple:
+    """
+    Maximum decomposition into cycles of the multigraph given as sorted ((a, b), count) pairs.
+    The first edge belongs to some cycle of any decomposition: every simple cycle through it is tried.
+    """
+    if not edges:
+        return ()
+    if edges in memo:
+        return memo[edges]
+
+    counts = dict(edges)
+    (first, second), _ = edges[0]
+    best: tuple = ()
+
+    for cycle in simple_cycles(counts, first, second):
+        for edge in zip(cycle, cycle[1:] + cycle[:1]):
+            counts[edge] -= 1
+        rest = search_cycles(tuple((e, c) for e, c in sorted(counts.items()) if c > 0), memo)
+        for edge in zip(cycle, cycle[1:] + cycle[:1]):
+            counts[edge] += 1
+        if not best or len(rest) + 1 > len(best):
+            best = (cycle,) + rest
+
+    memo[edges] = best
+    return best
+
+
+def simple_cycles(counts: Dict[Tuple[int, int], int], first: int, second: int) -> Generator[List[int], None, None]:
+    """
+    Cycles starting with edge first -> second, visiting each letter at most once.
+    """
+    successors: Dict[int, List[int]] = {}
+    for (a, b), count in counts.items():
+        if count > 0:
+            successors.setdefault(a, []).append(b)
+
+    path = [first, second]
+
+    def extend(vertex: int) -> Generator[List[int], None, None]:
+        for successor in successors.get(vertex, []):
+            if successor == first:
+                yield path[:]
+            elif successor not in path:
+                path.append(successor)
+                yield from extend(successor)
+                path.pop()
+
+    yield from extend(second)
+
+
+def min_swaps(start: Union[str, bytes], goal: Union[str, bytes]) -> List[Tuple[int, int]]:
+    """
+    Shortest sequence of swaps turning start into goal, see above for the proof of optimality.
+    :param start: Grid string of the shuffled waffle
+    :param goal: Grid string of the solved waffle
+    :return: Pairs of grid string indexes to swap, in order
+    """
+    edges = letter_edges(to_state(start), to_state(goal))
+    counts = {edge: len(cells) for edge, cells in edges.items()}
+    swaps: List[Tuple[int, int]] = []
+
+    for cycle in max_cycles(counts):
+        # Cell i needs letter cycle[k] and holds cycle[k + 1], which is needed by the next cell
+        cells = [edges[edge].pop() for edge in zip(cycle, cycle[1:] + cycle[:1])]
+        # The first cell sends its letter to the next one, and receives a letter to send further
+        swaps += [tuple(sorted((cells[0], cell))) for cell in cells[1:]]
+
+    return swaps
+
+
+def min_swap_count(start: Union[str, bytes], goal: Union[str, bytes]) -> int:
+    """
+    Minimum number of swaps turning start into goal.
+    """
+    edges = letter_edges(to_state(start), to_state(goal))
+    return sum(len(cells) for cells in edges.values()) - len(max_cycles(
+        {edge: len(cells) for edge, cells in edges.items()}))
+
+
+def cycle_path(start: SimplifiedWaffle, goal: SimplifiedWaffle) -> List[SimplifiedWaffle]:
+    """
+    Same as a_star, using min_swaps instead of a search.
+    :return: Waffles from start to goal
+    """
+    path = [start]
+    for i, j in min_swaps(start.letters, goal.letters):
+        path.append(path[-1].swapped(i, j, goal.letters))
+    return path
+
+
+def path_swaps(path: List[SimplifiedWaffle]) -> List[Tuple[int, int]]:
+    """
+    Swaps made along a path, as pairs of indexes in the grid string.
+    """
+    swaps = []
+    for a, b in zip(path, path[1:]):
+        i, j = [i for i in range(len(a.letters)) if a.letters[i] != b.letters[i]]
+        swaps.append((i, j))
+    return swaps
 
 
 def compare_waffles(waffle_a, waffle_b):
     output = ""
-    for a, b in zip(waffle_a.letters, waffle_b.letters):
+    for a, b in zip(to_text(waffle_a.letters), to_text(waffle_b.letters)):
         if a == b:
             output += "-"
         else:
@@ -188,9 +640,9 @@ def compare_waffles(waffle_a, waffle_b):
 
 
 if __name__ == "__main__":
-    start = SimplifiedWaffle("BESOLIEENIKOAREADWROR", diff="022102212202100202220", goal="BROILOAOASKEWREEDINER")
+    start = SimplifiedWaffle("BESOLIEENIKOAREADWROR", diff="022102212202100202220")
     #start = SimplifiedWaffle("CHASECGVINANELRNKENPT", diff="000001000000022001120", goal="CHASERGVINANECPNKNELT")
-    goal = SimplifiedWaffle("BROILOAOASKEWREEDINER")
+    goal = SimplifiedWaffle("BROILOAOASKEWREEDINER", goal="BROILOAOASKEWREEDINER")
 
     result = a_star(start, goal)
 
@@ -1,115 +1,337 @@
-import numpy as np
-from numpy.typing import ArrayLike
-from typing import List, Set, Tuple, Any, Dict
-from utils import load_data, check_grid, words_to_grid
+import time
+from typing import TYPE_CHECKING, List, Set, Tuple, Any, Dict, Optional, Iterable, Generator, Sequence
+from itertools import islice
+from utils import WORDS_CELLS, INTERSECTIONS, GRID_CELLS, REFERENCE_CELLS, Grid, grid_to_grid_string
+from lexicon import Lexicon, get_lexicon
+from stats import SolveStats, timed
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Positions of each word whose cell is not shared with a previous word,
+# i.e. the letters a word adds to the grid when words are placed in order
+OWNED_POSITIONS: List[List[int]] = [[p for p, cell in enumerate(WORDS_CELLS[w])
+                                     if all(cell not in WORDS_CELLS[v] for v in range(w))] for w in range(6)]
+
+# Changes whenever the solutions found for a puzzle may change, to tell apart cached results
+SOLVER_VERSION = 2
+
+# Puzzles filtered per array operation by batch_words_match, bounding its (chunk, 6, N, 5) temporary
+BATCH_CHUNK = 32
+
+# Slots, counted from the first one the search starts at, below which rec_find_solution checks
+# whether it was asked to stop
+STOP_CHECK_DEPTH = 2
+# Candidates tried, at any slot, between two checks of whether the search was asked to stop
+STOP_CHECK_INTERVAL = 1024
+
+# PREVIOUS_ARCS[word] lists (position, other word, other position) for the cells
+# a word shares with the words placed before it
+PREVIOUS_ARCS: List[List[Tuple[int, int, int]]] = [[(j, a, i) for (a, i), (b, j) in INTERSECTIONS if b == w]
+                                                   for w in range(6)]
+
+
+class Deadline:
+    """
+    Stop event of WaffleSolver (see WaffleSolver.stop), set once a time is reached.
+    """
+
+    def __init__(self, end: float):
+        """
+        :param end: Time at which the search stops, as given by time.time
+        """
+        self.end = end
+
+    def is_set(self) -> bool:
+        return time.time() >= self.end
 
 
 class WaffleSolver:
 
-    def __init__(self, shuffled_grid: ArrayLike, diff_matrix: ArrayLike):
+    def __init__(self, shuffled_grid: Grid, diff_matrix: Grid,
+                 candidates: Optional[List[List[str]]] = None, stats: Optional[SolveStats] = None,
+                 lexicon: Optional[Lexicon] = None):
+        """
+        :param shuffled_grid: Grid of letters, as shown by the game
+        :param diff_matrix: Colors of the grid (0 green, 1 yellow, 2 black)
+        :param candidates: Words matching each slot, if already known (see batch_words_match)
+        :param stats: If given, filled with counters and phase times of the solve
+        :param lexicon: Lexicon to look words up in, the shared one by default
+        """
         self.shuffled_grid = shuffled_grid
         self.diff_matrix = diff_matrix
-        self.location_constraints: List[List[Set[str]]] = words_constraints(self.shuffled_grid, self.diff_matrix)
+        self.stats = stats
+        self.lexicon: Lexicon = get_lexicon() if lexicon is None else lexicon
+        with timed(stats, "constraints"):
+            masks, requirements = cell_masks(self.shuffled_grid, self.diff_matrix)
+            self.location_constraints: List[List[Set[str]]] = masks_to_constraints(masks)
+            # Letters each word must hold at one of some positions, from yellow cells
+            self.requirements: List[List[Tuple[str, List[int]]]] = words_requirements(requirements)
+            if candidates is None:
+                candidates = [get_words_match(constraint, self.lexicon, required)
+                              for constraint, required in zip(self.location_constraints, self.requirements)]
+        self.candidates: List[List[str]] = candidates
         self.freq_constraints: Dict[str, int] = get_frequency(self.shuffled_grid)
+        # Number of each letter (A to Z) left to place
+        self.budget: List[int] = budget_from_frequency(self.freq_constraints)
         self.solution: List[str] = []
+        # Event (anything with is_set) stopping the search once set, see parallel_solver and Deadline
+        self.stop: Optional[Any] = None
+        # Candidates tried since the stop event was last checked
+        self.unchecked: int = 0
+        # Slot the last search started at, after the words of its prefix
+        self.start_depth: int = 0
 
     def solve(self) -> None:
         """
-        Returns a solution to the waffle puzzle.
-        This solution is a possibility, and might not be the right one.
-        This solution satisfies constraints set by the game.
-        :return: List of words forming the solution.
+        Looks for a solution to the waffle puzzle, stored in self.solution.
+        This solution satisfies constraints set by the game, but other ones might
+        exist: see count_solutions to know whether it is the only one.
+        Slots are left empty when the puzzle has no solution.
+        """
+        with timed(self.stats, "search"):
+            self.solution = next(self.iter_solutions(), ['' for i in range(6)])
+        if self.stats is not None:
+            self.stats.report()
+
+    def iter_solutions(self, prefix: Sequence[str] = ()) -> Generator[List[str], None, None]:
+        """
+        Lazily enumerates every list of words solving the waffle puzzle.
+        :param prefix: Words of the first slots, to enumerate only the solutions starting with them
+        """
+        if self.place(prefix):
+            yield from self.rec_find_solution(len(prefix))
+
+    def extensions(self, prefix: Sequence[str] = ()) -> List[List[str]]:
+        """
+        Lists the prefixes one word longer than prefix that still fit, i.e. the subtrees
+        of the search below prefix, in search order.
+        """
+        if not self.place(prefix):
+            return []
+        word_index = len(prefix)
+        extended = []
+        for word in self.candidates[word_index]:
+            added = ''.join([word[p] for p in OWNED_POSITIONS[word_index]])
+            if self.fits(word, word_index) and take_letters(self.budget, added):
+                extended.append(list(prefix) + [word])
+                give_letters(self.budget, added)
+        return extended
+
+    def place(self, prefix: Sequence[str]) -> bool:
+        """
+        Resets the search, with the words of prefix placed in the first slots.
+        :return: False if these words do not fit together
         """
         self.solution = ['' for i in range(6)]
-        if self.rec_find_solution(0):
-            return
+        self.budget = budget_from_frequency(self.freq_constraints)
+        self.unchecked = 0
+        self.start_depth = len(prefix)
+        for word_index, word in enumerate(prefix):
+            if not self.fits(word, word_index) or \
+                    not take_letters(self.budget, ''.join([word[p] for p in OWNED_POSITIONS[word_index]])):
+                return False
+            self.solution[word_index] = word
+        return True
+
+    def count_solutions(self, limit: Optional[int] = 2) -> int:
+        """
+        Counts the solutions of the waffle puzzle, stopping as soon as limit is reached.
+        With the default limit, the result tells whether the puzzle is ambiguous (2) or not.
+        :param limit: Maximum number of solutions to enumerate, None to count them all
+        :return: Number of solutions found
+        """
+        with timed(self.stats, "search"):
+            count = sum(1 for _ in islice(self.iter_solutions(), limit))
+        if self.stats is not None:
+            self.stats.report()
+        return count
 
-    def rec_find_solution(self, word_index: int) -> bool:
+    def rec_find_solution(self, word_index: int) -> Generator[List[str], None, None]:
         """
-        Recursive method to solve the waffle puzzle.
-        :return: boolean
+        Recursive generator solving the waffle puzzle.
+        Words are placed in self.solution, which is only copied when a full solution is found.
+        :return: Solutions whose first words are those in self.solution
         """
         # Ending condition
         if word_index > 5:
-            return True
+            yield self.solution[:]
+            return
+
+        stats = self.stats
+        if stats is not None:
+            stats.max_depth = max(stats.max_depth, word_index + 1)
+
+        for word in self.candidates[word_index]:
+            if self.stop is not None:
+                self.unchecked += 1
+                if word_index < self.start_depth + STOP_CHECK_DEPTH or self.unchecked >= STOP_CHECK_INTERVAL:
+                    if self.stop.is_set():
+                        # Not reset, so that every slot above returns at its next candidate
+                        return
+                    self.unchecked = 0
+            if stats is not None:
+                stats.candidates += 1
 
-        for word in get_words_match(self.location_constraints[word_index]):
             # See if words fits
-            option = self.solution[:]
-            option[word_index] = word
-            if check_grid(option, word_index) and check_freq_constraint(
-                    self.freq_constraints, get_frequency(words_to_grid(option))):
+            if not self.fits(word, word_index):
+                if stats is not None:
+                    stats.intersection_prunes += 1
+                continue
+
+            # Only letters of cells not shared with previous words are counted
+            added = ''.join([word[p] for p in OWNED_POSITIONS[word_index]])
+            if take_letters(self.budget, added):
                 self.solution[word_index] = word
-                if self.rec_find_solution(word_index + 1):
-                    return True
+                yield from self.rec_find_solution(word_index + 1)
                 self.solution[word_index] = ''
+                give_letters(self.budget, added)
+            elif stats is not None:
+                stats.frequency_prunes += 1
 
-        # No word fits, backtrack!
-        return False
+    def fits(self, word: str, word_index: int) -> bool:
+        """
+        Checks a word against the words placed before it: shared cells must
+        hold the same letters, and a word cannot appear twice.
+        """
+        for position, other, other_position in PREVIOUS_ARCS[word_index]:
+            if word[position] != self.solution[other][other_position]:
+                return False
+        return word not in self.solution[:word_index]
 
 
-def words_constraints(shuffled_grid: ArrayLike, diff_matrix: ArrayLike, details: bool = False) -> List[List[Set[str]]]:
-    constraints: List[List[Set[str]]] = [[set() for i in range(5)] for i in range(5)]
+def letter_bit(letter: str) -> int:
+    """
+    Bit of a letter in a 26 bits mask, A being bit 0.
+    """
+    return 1 << (ord(letter) - ord('A'))
 
-    green = np.where(diff_matrix == 0)
-    orange = np.where(diff_matrix == 1)
-    black = np.where(diff_matrix == 2)
 
-    if details:
-        print("Diff matrix:")
-        print(diff_matrix)
-        print("\nGreen:", list(zip(*green)))
-        print("Orange:", list(zip(*orange)))
-        print("Black:", list(zip(*black)))
+def mask_letters(mask: int) -> Set[str]:
+    return {chr(ord('A') + i) for i in range(26) if mask >> i & 1}
 
-    # Add black letters to other lines/columns
-    for pos in list(zip(*black)):
-        letter = shuffled_grid[pos]
 
-        # 1. Gather all positions
-        positions = {(x, y) for x in range(5) for y in range(5)}
+def cell_masks(shuffled_grid: Grid, diff_matrix: Grid) -> Tuple[List[int], List[Tuple[str, List[int]]]]:
+    """
+    Letters each cell of the solution may hold, deduced from the colors as get_diff computes them.
+    Cells are in grid string order, which is the order get_diff colors them in.
+
+    - A green cell holds its letter. A misplaced cell holds one of the misplaced letters, but not its own.
+    - A yellow letter is needed by a misplaced cell among those get_diff looked at (see REFERENCE_CELLS):
+      this gives a requirement, i.e. a letter and the cells one of which at least holds it.
+    - A black letter is needed by none of these cells, except the ones an earlier yellow cell with
+      the same letter may have used.
+    - Each yellow letter uses other cells than the previous ones. When there are as many yellow cells
+      as misplaced cells with a letter, the cells needing it are all among the required ones.
+    - A requirement left with a single cell fixes its letter. When as many cells as misplaced letters
+      are fixed to a letter, or can still hold it, no other cell holds it.
+    :param shuffled_grid: Grid of letters, as shown by the game
+    :param diff_matrix: Colors of the grid (0 green, 1 yellow, 2 black)
+    :return: 26 bits mask of each cell, and requirements
+    """
+    letters = grid_to_grid_string(shuffled_grid).upper()
+    colors = [int(color) for color in grid_to_grid_string(diff_matrix)]
+    size = len(letters)
+    misplaced = [i for i in range(size) if colors[i] != 0]
+
+    # Number of misplaced cells with each letter: as many misplaced cells need it
+    needed: Dict[str, int] = {}
+    pool = 0
+    for i in misplaced:
+        needed[letters[i]] = needed.get(letters[i], 0) + 1
+        pool |= letter_bit(letters[i])
+
+    masks = [letter_bit(letters[i]) if colors[i] == 0 else pool & ~letter_bit(letters[i]) for i in range(size)]
+    requirements: List[Tuple[str, List[int]]] = []
+    # Cells an earlier yellow cell with each letter may have used
+    used: Dict[str, Set[int]] = {}
+
+    for i in misplaced:
+        letter = letters[i]
+        cells = [j for j in REFERENCE_CELLS[i] if j != i and colors[j] != 0]
+        if colors[i] == 1:
+            requirements.append((letter, cells))
+            used.setdefault(letter, set()).update(cells)
+        else:
+            for j in cells:
+                if j not in used.get(letter, ()):
+                    masks[j] &= ~letter_bit(letter)
+
+    for letter, count in needed.items():
+        required = [cells for other, cells in requirements if other == letter]
+        if len(required) == count:
+            cells = set().union(*required)
+            for j in misplaced:
+                if j not in cells:
+                    masks[j] &= ~letter_bit(letter)
+
+    changed = True
+    while changed:
+        changed = False
+        for index, (letter, cells) in enumerate(requirements):
+            cells = [j for j in cells if masks[j] & letter_bit(letter)]
+            requirements[index] = (letter, cells)
+            if len(cells) == 1 and masks[cells[0]] != letter_bit(letter):
+                masks[cells[0]] = letter_bit(letter)
+                changed = True
+
+        for letter, count in needed.items():
+            bit = letter_bit(letter)
+            fixed = [j for j in misplaced if masks[j] == bit]
+            possible = [j for j in misplaced if masks[j] & bit]
+            if len(fixed) == count and len(possible) > count:
+                for j in possible:
+                    if masks[j] != bit:
+                        masks[j] &= ~bit
+                changed = True
+            elif len(possible) == count and len(fixed) < count:
+                for j in possible:
+                    masks[j] = bit
+                changed = True
+
+    return masks, requirements
+
+
+def words_requirements(requirements: List[Tuple[str, List[int]]]) -> List[List[Tuple[str, List[int]]]]:
+    """
+    Requirements holding on a single word, as (letter, positions in the word) for each word.
+    """
+    output: List[List[Tuple[str, List[int]]]] = [[] for _ in range(6)]
+    for letter, cells in requirements:
+        for w, word_cells in enumerate(WORDS_CELLS):
+            if cells and all(j in word_cells for j in cells):
+                output[w].append((letter, [word_cells.index(j) for j in cells]))
+                break
+    return output
 
-        # Remove lines / columns positions
-        positions.difference(set(get_line_column(pos)))
 
-        # Now that positions have been curated, we add the letter to the constraints
-        for x, y in positions:
-            constraints[x][y].add(letter)
+def words_constraints(shuffled_grid: Grid, diff_matrix: Grid, details: bool = False) -> List[List[Set[str]]]:
+    """
+    Letters allowed at each position of each word, see cell_masks.
+    :param shuffled_grid: Grid of letters, as shown by the game
+    :param diff_matrix: Colors of the grid (0 green, 1 yellow, 2 black)
+    :param details: Prints the letters allowed in each cell
+    :return: Sets of allowed letters, for each position of each word
+    """
+    masks, requirements = cell_masks(shuffled_grid, diff_matrix)
 
     if details:
-        print("\nAdded black letters:")
-        print(constraints)
+        for (x, y), mask in zip(GRID_CELLS, masks):
+            print((x, y), ''.join(sorted(mask_letters(mask))))
+        print("Requirements:", requirements)
 
-    # Add orange letters on their respective lines and/or columns
-    for pos in list(zip(*orange)):
-        letter = shuffled_grid[pos]
+    return masks_to_constraints(masks)
 
-        for i, j in get_line_column(pos):
-            if (i, j) != pos:
-                constraints[i][j].add(letter)
-            elif letter in constraints[i][j]:
-                constraints[i][j].remove(letter)
 
-    if details:
-        print("\nAdded orange letters:")
-        print(constraints)
-
-    # Set letters that are right
-    for x, y in list(zip(*green)):
-        letter = shuffled_grid[x, y]
-        if letter == ' ':
-            constraints[x][y] = set()
-        else:
-            constraints[x][y] = set(letter)
-
-    if details:
-        print("\nAdded green letters:")
-        print(constraints)
-
-    return grid_constraints_to_constraints(constraints)
+def masks_to_constraints(masks: List[int]) -> List[List[Set[str]]]:
+    """
+    Converts the masks of the cells to sets of allowed letters, for each position of each word.
+    """
+    return [[mask_letters(masks[j]) for j in cells] for cells in WORDS_CELLS]
 
 
-def get_frequency(waffle_grid: ArrayLike, details: bool = False) -> Dict[str, int]:
+def get_frequency(waffle_grid: Grid, details: bool = False) -> Dict[str, int]:
     """
     Returns a dictionary with the frequency of each letter in the grid.
     :param waffle_grid:
@@ -126,6 +348,38 @@ def get_frequency(waffle_grid: ArrayLike, details: bool = False) -> Dict[str, in
     return {k: v for k, v in frequency.items() if v > 0}
 
 
+def budget_from_frequency(frequency: Dict[str, int]) -> List[int]:
+    """
+    Converts letters frequencies to a 26 elements list of counts, from A to Z.
+    """
+    budget = [0] * 26
+    for letter, count in frequency.items():
+        budget[ord(letter) - ord('A')] = count
+    return budget
+
+
+def take_letters(budget: List[int], letters: str) -> bool:
+    """
+    Removes letters from the budget, leaving it untouched if one of them is missing.
+    :return: True if every letter was available
+    """
+    for i, letter in enumerate(letters):
+        code = ord(letter) - ord('A')
+        if budget[code] == 0:
+            give_letters(budget, letters[:i])
+            return False
+        budget[code] -= 1
+    return True
+
+
+def give_letters(budget: List[int], letters: str) -> None:
+    """
+    Puts letters back into the budget.
+    """
+    for letter in letters:
+        budget[ord(letter) - ord('A')] += 1
+
+
 def get_line_column(position: Tuple[int, int]):
     x, y = position
 
@@ -163,15 +417,117 @@ def grid_to_words(grid: List[List[Any]]) -> List[Any]:
     return [''.join(w) for w in output]
 
 
-def get_words_match(constraint: List[Set[str]]) -> List[str]:
+def get_words_match(constraint: List[Set[str]], lexicon: Optional[Lexicon] = None,
+                    required: Iterable[Tuple[str, List[int]]] = ()) -> List[str]:
     """
     Returns the words that match the given constraint.
-    :param constraint:
-    :return:
+    :param constraint: Sets of allowed letters, one per position
+    :param lexicon: Lexicon to look words up in, the shared one by default
+    :param required: (letter, positions) pairs, the word holding letter at one of positions at least
+    :return: Matching words, in lexicon order
+    """
+    if lexicon is None:
+        lexicon = get_lexicon()
+    return lexicon.words_from_bits(match_bits(lexicon, constraint, required))
+
+
+def match_bits(lexicon: Lexicon, constraint: List[Set[str]], required: Iterable[Tuple[str, List[int]]] = ()) -> int:
+    """
+    Bitset of the words matching a constraint and requirements, see get_words_match.
+    """
+    bits = lexicon.match_bits(constraint)
+    for letter, positions in required:
+        any_position = 0
+        for position in positions:
+            any_position |= lexicon.with_letter(position, letter)
+        bits &= any_position
+    return bits
+
+
+def constraint_mask(constraint: List[Set[str]]) -> 'np.ndarray':
+    """
+    Converts the constraint of a word to a (5, 26) boolean mask of allowed letters.
+    :param constraint: Sets of allowed letters, one per position
+    :return: mask[position, letter] is True when letter is allowed at position
+    """
+    import numpy as np
+    mask = np.zeros((5, 26), dtype=bool)
+    for position, letters in enumerate(constraint):
+        for letter in letters:
+            if 'A' <= letter <= 'Z':
+                mask[position, ord(letter) - ord('A')] = True
+    return mask
+
+
+def match_masks(masks: 'np.ndarray', words: 'np.ndarray') -> 'np.ndarray':
+    """
+    Filters words against any number of constraint masks at once.
+    :param masks: (..., 5, 26) boolean masks, see constraint_mask
+    :param words: (N, 5) encoded words, see Lexicon.array
+    :return: (..., N) boolean array, True where the word matches the mask
+    """
+    import numpy as np
+    return masks[..., np.arange(5), words].all(axis=-1)
+
+
+def requirements_mask(required: Iterable[Tuple[str, List[int]]], words: 'np.ndarray') -> 'np.ndarray':
+    """
+    Filters words against the requirements of a slot, see words_requirements.
+    :param words: (N, 5) encoded words, see Lexicon.array
+    :return: (N,) boolean array, True where the word holds each letter at one of its positions
+    """
+    import numpy as np
+    mask = np.ones(len(words), dtype=bool)
+    for letter, positions in required:
+        mask &= (words[:, positions] == ord(letter) - ord('A')).any(axis=1)
+    return mask
+
+
+def batch_words_match(puzzles: Iterable[Tuple[Grid, Grid]], lexicon: Optional[Lexicon] = None,
+                      chunk_size: int = BATCH_CHUNK) -> 'np.ndarray':
+    """
+    Matching words of every slot of many puzzles, same as get_words_match with the requirements
+    of the slot, filtered by array operations over chunks of puzzles.
+    NumPy is only imported by this vectorized path.
+    :param puzzles: (shuffled_grid, diff_matrix) pairs
+    :param lexicon: Lexicon to look words up in, the shared one by default
+    :param chunk_size: Puzzles filtered at once
+    :return: (P, 6, N) boolean array, True where word n fits slot s of puzzle p
+    """
+    import numpy as np
+    if lexicon is None:
+        lexicon = get_lexicon()
+    words = lexicon.array
+    iterator = iter(puzzles)
+    matches = [np.zeros((0, 6, len(words)), dtype=bool)]
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return np.concatenate(matches)
+
+        masks, requirements = [], []
+        for grid, diff in chunk:
+            cells, cell_requirements = cell_masks(grid, diff)
+            masks.append([constraint_mask(constraint) for constraint in masks_to_constraints(cells)])
+            requirements.append(words_requirements(cell_requirements))
+
+        chunk_matches = match_masks(np.array(masks, dtype=bool), words)
+        for p, slots in enumerate(requirements):
+            for s, required in enumerate(slots):
+                if required:
+                    chunk_matches[p, s] &= requirements_mask(required, words)
+        matches.append(chunk_matches)
+
+
+def candidates_from_mask(mask: 'np.ndarray', lexicon: Optional[Lexicon] = None) -> List[List[str]]:
+    """
+    Converts the (6, N) matches of a puzzle, as returned by batch_words_match, to lists of words.
     """
-    return [word for word in load_data() if word[0] in constraint[0] and
-            word[1] in constraint[1] and word[2] in constraint[2] and
-            word[3] in constraint[3] and word[4] in constraint[4]]
+    import numpy as np
+    if lexicon is None:
+        lexicon = get_lexicon()
+    return [[lexicon.words[i] for i in np.flatnonzero(row)] for row in mask]
 
 
 def check_freq_constraint(true, observed) -> bool:
@@ -187,9 +543,9 @@ def check_freq_constraint(true, observed) -> bool:
 if __name__ == "__main__":
     from waffle import Waffle
     waffle = Waffle()
-    waffle.load_shuffled_waffle(['aatue', 'eltbv', 'roaal', 'lovin', 'tiein', 'raent'],
-                                np.array([[0, 2, 1, 0, 0], [2, 0, 2, 0, 2], [1, 2, 0, 1, 2],
-                                          [2, 0, 2, 0, 1], [0, 2, 2, 2, 0]]))
+    waffle.load_shuffled_waffle('roaalaaoeltbvnuitiein',
+                                [[0, 2, 1, 0, 0], [2, 0, 2, 0, 2], [1, 2, 0, 1, 2],
+                                 [2, 0, 2, 0, 1], [0, 2, 2, 2, 0]])
 
     solver = WaffleSolver(waffle.shuffled_grid, waffle.diff)
     solver.solve()